@@ -0,0 +1,99 @@
+import os
+import re
+import sys
+import time
+import argparse
+from collections import Counter
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main')))
+from contexto import SLOTS_CONTEXTO, CasadorPalavras, ler_vocabulario
+from normalizacao import preprocessar_texto
+
+# ==========================================================
+# Vazão da extração de contexto: listas com `in` × regex compilada do vocabulário
+# ==========================================================
+# antigo      quatro laços de `in` sobre listas fixas + a regex de pronomes (como era no Treino)
+# casador     CasadorPalavras.casar: normalização + uma regex de alternância, sem cache
+# casador_ja_normalizado
+#             só a regex, sobre o texto que o atendimento já normaliza para a busca: é o
+#             caminho do Chatbot.responder / EstadoConversa (casar fica só por conveniência)
+#
+# Também conta em quantas mensagens os dois discordam, com exemplos: são os casos de
+# entrada sem acento ("calcario") e de palavra dentro de outra ("alta" em "faltando").
+
+CAMINHO_DADOS = os.path.join(os.path.dirname(__file__), '..', 'Dados', 'dataset_expandido_balanceado.csv')
+
+def extrair_contexto_antigo(entrada):
+    contexto = dict.fromkeys(SLOTS_CONTEXTO)
+    entrada_lower = entrada.lower()
+    listas = {
+        'tipo_solo': ['arenoso', 'argiloso', 'humoso', 'calcário', 'ácido', 'alcalino'],
+        'nivel_fertilidade': ['alta', 'média', 'baixa', 'alta fertilidade', 'média fertilidade', 'baixa fertilidade'],
+        'problema': ['seco', 'úmido', 'compactado', 'fraco', 'pobre', 'ácido', 'alcalino'],
+        'acao_desejada': ['melhorar', 'adubar', 'nutrir', 'fortalecer', 'recuperar', 'corrigir'],
+    }
+    for slot, palavras in listas.items():
+        for palavra in palavras:
+            if palavra in entrada_lower:
+                contexto[slot] = palavra
+                break
+    referencia = re.search(r'\b(ele|ela|isso|isso mesmo)\b', entrada_lower) is not None
+    return contexto, referencia
+
+def extrair_contexto_casador(casador, entrada):
+    casado = casador.casar(entrada)
+    return {slot: casado.get(slot) for slot in SLOTS_CONTEXTO}, 'referencia' in casado
+
+def medir(funcao, textos, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcao(texto)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return len(textos) / melhor
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vazão e concordância da extração de contexto")
+    parser.add_argument("--dados", default=CAMINHO_DADOS)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--exemplos", type=int, default=5)
+    args = parser.parse_args()
+
+    textos = pd.read_csv(args.dados, sep=';', encoding='utf-8')['input_text'].astype(str).tolist()
+    inicio = time.perf_counter()
+    casador = CasadorPalavras(ler_vocabulario())
+    print(f"🔧 Vocabulário compilado em {1000 * (time.perf_counter() - inicio):.1f} ms")
+
+    normalizados = [preprocessar_texto(t) for t in textos]
+    vazao_antigo = medir(extrair_contexto_antigo, textos, args.repeticoes)
+    vazoes = {
+        'casador': medir(lambda t: extrair_contexto_casador(casador, t), textos, args.repeticoes),
+        'casador_ja_normalizado': medir(casador.casar_normalizado, normalizados, args.repeticoes),
+    }
+    print(f"⏱️ {'antigo':>22}: {vazao_antigo:10.0f} mensagens/s")
+    for nome, vazao in vazoes.items():
+        print(f"⏱️ {nome:>22}: {vazao:10.0f} mensagens/s ({vazao / vazao_antigo:.2f}×)")
+
+    diferencas = Counter()
+    mensagens_diferentes = 0
+    exemplos = []
+    for texto in textos:
+        antigo, novo = extrair_contexto_antigo(texto), extrair_contexto_casador(casador, texto)
+        if antigo != novo:
+            mensagens_diferentes += 1
+            for slot in SLOTS_CONTEXTO:
+                if antigo[0][slot] != novo[0][slot]:
+                    diferencas[slot] += 1
+            if antigo[1] != novo[1]:
+                diferencas['referencia'] += 1
+            if len(exemplos) < args.exemplos:
+                exemplos.append((texto, antigo, novo))
+    print(f"🔍 Contexto diferente em {mensagens_diferentes} de {len(textos)} mensagens, por slot: {dict(diferencas)}")
+    for texto, antigo, novo in exemplos:
+        print(f"   {texto!r}\n      antigo {antigo}\n      novo   {novo}")
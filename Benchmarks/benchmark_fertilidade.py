@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main')))
+from previsao_fertilidade import CAMINHO_MODELO, CAMINHO_SCALER, PrevisorFertilidade
+from modelo_numpy import RedeNumPy, extrair_camadas
+
+# ==========================================================
+# Vazão da previsão de fertilidade: por amostra × em lote
+# ==========================================================
+# por_amostra   o que prever_novo fazia: scaler.transform + modelo.predict em uma linha
+# predict_lote  PrevisorFertilidade com modelo.predict por lote de `tamanho_lote`
+# tf_function   PrevisorFertilidade com o tf.function de assinatura fixa (padrão)
+# numpy         PrevisorFertilidade com a RedeNumPy (BatchNorm dobrada, sem TensorFlow)
+#
+# As amostras são sintéticas, uniformes entre o mínimo e o máximo vistos pelo scaler
+# (ou lidas de um CSV com --dados). O caminho por amostra roda só em um subconjunto,
+# e as probabilidades dos caminhos em lote são comparadas com as dele.
+
+def gerar_amostras(scaler, n, semente=42):
+    rng = np.random.default_rng(semente)
+    minimos = np.asarray(scaler.data_min_, dtype=np.float32)
+    maximos = np.asarray(scaler.data_max_, dtype=np.float32)
+    return (minimos + rng.random((n, len(minimos)), dtype=np.float32) * (maximos - minimos)).astype(np.float32)
+
+def prever_por_amostra(modelo, scaler, amostras):
+    probabilidades = []
+    for amostra in amostras:
+        normalizada = scaler.transform(amostra.reshape(1, -1))
+        probabilidades.append(modelo.predict(normalizada, verbose=0)[0])
+    return np.asarray(probabilidades, dtype=np.float32)
+
+def medir(funcao, amostras, repeticoes=1):
+    funcao(amostras[:2])  # aquecimento: trace do tf.function e construção do predict
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(amostras)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return len(amostras) / melhor, resultado
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vazão da previsão de fertilidade por amostra e em lote")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO)
+    parser.add_argument("--scaler", default=CAMINHO_SCALER)
+    parser.add_argument("--dados", default=None, help="CSV de análises (sep ';') em vez de amostras sintéticas")
+    parser.add_argument("--n", type=int, default=100000, help="amostras sintéticas")
+    parser.add_argument("--n-por-amostra", type=int, default=200, help="amostras no caminho por amostra (lento)")
+    parser.add_argument("--tamanho-lote", type=int, default=4096)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    import joblib
+    from tensorflow.keras.models import load_model
+    modelo = load_model(args.modelo)
+    scaler = joblib.load(args.scaler)
+    # O scaler foi ajustado com nomes de colunas; o aviso por chamada com arrays não interessa aqui
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    previsor_tf = PrevisorFertilidade(modelo, scaler, args.tamanho_lote, compilar=True)
+    previsor_predict = PrevisorFertilidade(modelo, scaler, args.tamanho_lote, compilar=False)
+    previsor_numpy = PrevisorFertilidade(RedeNumPy(extrair_camadas(modelo)), scaler, args.tamanho_lote, compilar=False)
+    if args.dados:
+        import pandas as pd
+        amostras = previsor_tf.matriz(pd.read_csv(args.dados, sep=';'))
+    else:
+        amostras = gerar_amostras(scaler, args.n)
+    subconjunto = amostras[:args.n_por_amostra]
+
+    vazao_amostra, referencia = medir(lambda a: prever_por_amostra(modelo, scaler, a), subconjunto)
+    print(f"📐 {len(amostras)} amostras × {amostras.shape[1]} features, lote de {args.tamanho_lote}")
+    print(f"⏱️ {'por_amostra':>12}: {vazao_amostra:12.0f} amostras/s ({len(subconjunto)} amostras)")
+    for nome, previsor in (('predict_lote', previsor_predict), ('tf_function', previsor_tf),
+                           ('numpy', previsor_numpy)):
+        vazao, probabilidades = medir(previsor.prever_proba, amostras, args.repeticoes)
+        diferenca = float(np.abs(probabilidades[:len(subconjunto)] - referencia).max())
+        concordancia = float((probabilidades[:len(subconjunto)].argmax(1) == referencia.argmax(1)).mean())
+        print(f"⏱️ {nome:>12}: {vazao:12.0f} amostras/s ({vazao / vazao_amostra:.0f}×) | "
+              f"diferença máx. {diferenca:.2e}, mesma classe em {concordancia:.1%}")
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# ==========================================================
+# Benchmark de inicialização da GUI
+# ==========================================================
+# Cada medida roda em um processo Python novo (imports frios):
+#   importacao  tempo de `import ChatBoT` e se torch / sentence_transformers foram carregados
+#   janela      tempo do início do processo até a janela ser desenhada pela primeira vez
+#   modelo      tempo até o carregamento em segundo plano do artefato terminar
+
+PASTA_MAIN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main'))
+
+CODIGO_IMPORTACAO = """
+import sys, time, json
+inicio = time.perf_counter()
+import ChatBoT
+print(json.dumps({
+    'importacao_ms': 1000 * (time.perf_counter() - inicio),
+    'torch': 'torch' in sys.modules,
+    'sentence_transformers': 'sentence_transformers' in sys.modules,
+}))
+"""
+
+CODIGO_INICIO = """
+import sys, time, json
+inicio = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+import ChatBoT
+app = QApplication(sys.argv)
+janela = ChatBoT.ChatbotWindow(caminho_artefato=sys.argv[1])
+janela.show()
+app.processEvents()
+janela.repaint()
+janela_ms = 1000 * (time.perf_counter() - inicio)
+while janela.chatbot is None and janela.tarefa_carregamento is not None:
+    app.processEvents()
+    time.sleep(0.001)
+modelo_ms = 1000 * (time.perf_counter() - inicio) if janela.chatbot is not None else None
+janela.close()
+print(json.dumps({'janela_ms': janela_ms, 'modelo_ms': modelo_ms}))
+"""
+
+def executar(codigo, *argumentos, offscreen=False):
+    ambiente = dict(os.environ)
+    if offscreen:
+        ambiente['QT_QPA_PLATFORM'] = 'offscreen'
+    saida = subprocess.run(
+        [sys.executable, '-c', codigo, *argumentos], cwd=PASTA_MAIN, env=ambiente,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    # Só a última linha é o resultado; o resto são os prints do próprio app
+    return json.loads(saida.strip().splitlines()[-1])
+
+def medir_importacao(repeticoes=5):
+    medidas = [executar(CODIGO_IMPORTACAO) for _ in range(repeticoes)]
+    return {
+        'importacao_ms': statistics.median(m['importacao_ms'] for m in medidas),
+        'torch': any(m['torch'] for m in medidas),
+        'sentence_transformers': any(m['sentence_transformers'] for m in medidas),
+    }
+
+def medir_inicio(caminho_artefato, repeticoes=3, offscreen=False):
+    medidas = [executar(CODIGO_INICIO, caminho_artefato, offscreen=offscreen) for _ in range(repeticoes)]
+    modelo = [m['modelo_ms'] for m in medidas if m['modelo_ms'] is not None]
+    return {
+        'janela_ms': statistics.median(m['janela_ms'] for m in medidas),
+        'modelo_ms': statistics.median(modelo) if modelo else None,
+    }
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de import e de abertura da janela do chatbot")
+    parser.add_argument("--artefato", default="modelo_semantico", help="diretório do artefato do modelo")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--offscreen", action="store_true", help="usa a plataforma Qt offscreen (sem monitor)")
+    args = parser.parse_args()
+    caminho_artefato = os.path.abspath(args.artefato)
+
+    importacao = medir_importacao(args.repeticoes)
+    print(f"📦 import ChatBoT: {importacao['importacao_ms']:.0f} ms "
+          f"(torch carregado: {'sim' if importacao['torch'] else 'não'}, "
+          f"sentence_transformers carregado: {'sim' if importacao['sentence_transformers'] else 'não'})")
+
+    inicio = medir_inicio(caminho_artefato, args.repeticoes, args.offscreen)
+    print(f"🪟 Janela desenhada em {inicio['janela_ms']:.0f} ms")
+    if inicio['modelo_ms'] is None:
+        print(f"⚠️ Modelo não carregou a partir de {caminho_artefato}")
+    else:
+        print(f"🧠 Modelo pronto em {inicio['modelo_ms']:.0f} ms")
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main')))
+from indice_semantico import BuscaExaustiva, busca_exaustiva, normalizar_linhas
+
+# ==========================================================
+# Microbenchmark da pontuação por consulta
+# ==========================================================
+# cos_sim      o que util.cos_sim fazia: normaliza a consulta E a matriz inteira a cada chamada
+# gemv         matriz pré-normalizada: um produto matriz-vetor + argmax
+# gemv_top_k   o mesmo produto + argpartition dos k melhores
+#
+# Para cada estratégia: latência mediana por consulta e pico de memória alocada
+# durante uma consulta (tracemalloc enxerga as alocações do NumPy).
+
+def cos_sim_completo(consulta, embeddings):
+    consulta = consulta / np.linalg.norm(consulta)
+    matriz = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similaridades = matriz @ consulta
+    indice = int(similaridades.argmax())
+    return indice, float(similaridades[indice])
+
+def medir(funcao, consultas, repeticoes):
+    funcao(consultas[0])
+    tempos = []
+    for _ in range(repeticoes):
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            funcao(consulta)
+            tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    picos = []
+    for consulta in consultas:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        funcao(consulta)
+        picos.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return 1e6 * statistics.median(tempos), max(picos)
+
+def carregar_embeddings(caminho_artefato, n, dimensao, semente):
+    if caminho_artefato:
+        return np.load(os.path.join(caminho_artefato, 'embeddings.npy'))
+    rng = np.random.default_rng(semente)
+    return rng.normal(size=(n, dimensao)).astype(np.float32)
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência e alocações por consulta da pontuação por similaridade")
+    parser.add_argument("--artefato", default=None, help="usa o embeddings.npy de um artefato em vez de dados sintéticos")
+    parser.add_argument("--n", type=int, default=20000, help="perguntas sintéticas")
+    parser.add_argument("--dimensao", type=int, default=384)
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    embeddings = carregar_embeddings(args.artefato, args.n, args.dimensao, 42)
+    embeddings_norm = np.ascontiguousarray(normalizar_linhas(embeddings))
+    indice = BuscaExaustiva(embeddings_norm)
+    consultas = np.random.default_rng(7).normal(size=(args.consultas, embeddings.shape[1])).astype(np.float32)
+
+    estrategias = {
+        'cos_sim': lambda c: cos_sim_completo(c, embeddings),
+        'gemv': lambda c: busca_exaustiva(c, embeddings_norm),
+        f'gemv_top_{args.k}': lambda c: indice.buscar_top_k(c, args.k),
+    }
+
+    print(f"📐 {len(embeddings)} perguntas × {embeddings.shape[1]} dimensões "
+          f"({embeddings_norm.nbytes / 2**20:.1f} MiB em float32)")
+    for nome, funcao in estrategias.items():
+        latencia_us, pico = medir(funcao, consultas, args.repeticoes)
+        print(f"⏱️ {nome:>12}: {latencia_us:9.1f} µs/consulta, pico alocado {pico / 1024:10.1f} KiB")
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import datetime
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+PASTA_MAIN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main'))
+PASTA_TREINO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Treino'))
+PASTA_RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PASTA_MAIN)
+sys.path.insert(0, PASTA_TREINO)
+from artefato import CAMINHO_ARTEFATO
+
+# ==========================================================
+# Avaliação offline e regressão do pipeline de recuperação
+# ==========================================================
+# 1) Separa uma fatia estratificada por intent do CSV (as consultas de teste)
+# 2) Monta um artefato só com o resto, usando o transformer e o cache de embeddings
+#    do artefato base e a mesma configuração dele (backend, precisão, votação)
+# 3) Em um processo novo, carrega o Chatbot e passa cada consulta bruta por
+#    get_response: preprocessar_texto -> encode -> pontuação, sem cache de respostas
+# 4) Grava acurácia top-1, rejeição no limiar, latência p50/p95/p99, vazão e pico de RSS
+#    em JSON com o commit atual; com --comparar, falha (código 1) se piorar além da tolerância
+#
+# Acerto: a resposta esperada, ou uma resposta de rejeição quando a pergunta é 'nao_entendido'.
+# Os JSON vão para Benchmarks/resultados/ (fora do git); guarde à parte o que servir de referência.
+
+CAMINHO_DADOS = os.path.join(PASTA_RAIZ, 'Dados', 'dataset_expandido_balanceado.csv')
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+CODIGO_MEDICAO = """
+import sys, time, json
+import numpy as np
+
+def pico_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux em KiB, macOS em bytes
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 1024
+
+from motor_chatbot import Chatbot, RESPOSTA_NAO_ENTENDIDA, preprocessar_texto
+from votacao import INTENT_REJEICAO
+
+with open(sys.argv[2], 'r', encoding='utf-8') as f:
+    dados = json.load(f)
+consultas = dados['consultas']
+rejeicoes = set(dados['respostas_rejeicao']) | {RESPOSTA_NAO_ENTENDIDA}
+
+inicio = time.perf_counter()
+bot = Chatbot(sys.argv[1], tamanho_cache=0)
+carregamento_ms = 1000 * (time.perf_counter() - inicio)
+bot.get_response('aquecimento do modelo antes da medida')
+
+tempos, respostas = [], []
+inicio = time.perf_counter()
+for c in consultas:
+    t = time.perf_counter()
+    respostas.append(bot.get_response(c['input_text']))
+    tempos.append(time.perf_counter() - t)
+total = time.perf_counter() - inicio
+
+acertos = np.array([r == c['resposta'] or (c['intent'] == INTENT_REJEICAO and r in rejeicoes)
+                    for r, c in zip(respostas, consultas)])
+rejeitadas = np.array([bot.rejeitada(r) for r in respostas])
+exatas = np.array([bot.indice_exato.get(preprocessar_texto(c['input_text'])) is not None for c in consultas])
+intents = np.array([c['intent'] for c in consultas])
+tempos_ms = 1000 * np.asarray(tempos)
+
+print(json.dumps({
+    'n_consultas': len(consultas),
+    'acuracia_top1': float(acertos.mean()),
+    'taxa_rejeicao': float(rejeitadas.mean()),
+    'fracao_correspondencia_exata': float(exatas.mean()),
+    'acuracia_sem_correspondencia_exata': float(acertos[~exatas].mean()) if (~exatas).any() else None,
+    'acuracia_por_intent': {i: float(acertos[intents == i].mean()) for i in sorted(set(intents))},
+    'latencia_p50_ms': float(np.percentile(tempos_ms, 50)),
+    'latencia_p95_ms': float(np.percentile(tempos_ms, 95)),
+    'latencia_p99_ms': float(np.percentile(tempos_ms, 99)),
+    'vazao_consultas_s': len(consultas) / total,
+    'carregamento_ms': carregamento_ms,
+    'pico_rss_mb': pico_rss_mb(),
+}))
+"""
+
+# Métricas comparadas com --comparar: (nome, maior é melhor?, tolerância usada)
+REGRESSOES = (
+    ('acuracia_top1', True, 'acuracia'),
+    ('latencia_p95_ms', False, 'latencia'),
+    ('vazao_consultas_s', True, 'latencia'),
+    ('pico_rss_mb', False, 'memoria'),
+)
+
+# ==========================================================
+# Divisão estratificada e artefato de avaliação
+# ==========================================================
+
+def dividir_estratificado(df, fracao=0.1, semente=42, coluna='intent'):
+    # Mesma fração de cada intent no teste (pelo menos uma linha por intent)
+    rng = np.random.default_rng(semente)
+    teste = []
+    for _, linhas in sorted(df.groupby(coluna).indices.items()):
+        n = max(1, int(round(len(linhas) * fracao)))
+        teste.append(rng.permutation(linhas)[:n])
+    idx_teste = np.sort(np.concatenate(teste))
+    idx_treino = np.setdiff1d(np.arange(len(df)), idx_teste)
+    return idx_teste, idx_treino
+
+def montar_artefato_avaliacao(df_treino, caminho_base, caminho):
+    # Import tardio: o script de treino traz sentence_transformers junto
+    import Treino_ChatBot as treino
+    from artefato import Artefato
+
+    base = Artefato(caminho_base)
+    manifesto = base.manifesto
+    modelo_st = base.carregar_modelo()
+    cache_anterior = base.cache_embeddings()
+    base = None
+
+    embeddings, _ = treino.gerar_embeddings_incremental(modelo_st, df_treino, cache_anterior, caminho + '.blocos')
+    embeddings, df_treino = treino.deduplicar_banco(embeddings, df_treino)
+    treino.salvar_modelo_e_dados(modelo_st, embeddings, df_treino, caminho,
+                                 manifesto.get('indice') or 'centroides', precisao=manifesto.get('precisao', 'float32'),
+                                 votacao=manifesto.get('votacao'))
+    shutil.rmtree(caminho + '.blocos', ignore_errors=True)
+    return {'indice': manifesto.get('indice'), 'precisao': manifesto.get('precisao', 'float32'),
+            'votacao': manifesto.get('votacao') is not None}
+
+# ==========================================================
+# Medição em processo separado e comparação
+# ==========================================================
+
+def medir(caminho_artefato, caminho_consultas):
+    # Processo novo: o pico de RSS é só o do chatbot servindo, sem o treino
+    saida = subprocess.run(
+        [sys.executable, '-c', CODIGO_MEDICAO, caminho_artefato, caminho_consultas], cwd=PASTA_MAIN,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    # Só a última linha é o resultado; o resto são os prints do próprio chatbot
+    return json.loads(saida.strip().splitlines()[-1])
+
+def commit_atual():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=PASTA_RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-modificado' if sujo else '')
+
+def comparar(resultado, referencia, tolerancias):
+    # Lista de regressões: variação relativa pior que a tolerância (acurácia em pontos absolutos)
+    regressoes = []
+    for nome, maior_melhor, tipo in REGRESSOES:
+        atual, anterior = resultado['metricas'].get(nome), referencia['metricas'].get(nome)
+        if atual is None or anterior is None:
+            continue
+        if tipo == 'acuracia':
+            piora = anterior - atual
+        elif anterior > 0:
+            piora = (anterior - atual) / anterior if maior_melhor else (atual - anterior) / anterior
+        else:
+            continue
+        if piora > tolerancias[tipo]:
+            regressoes.append((nome, anterior, atual))
+    return regressoes
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação offline e regressão do pipeline de recuperação")
+    parser.add_argument("--dados", default=CAMINHO_DADOS)
+    parser.add_argument("--artefato", default=CAMINHO_ARTEFATO,
+                        help="artefato base: fornece o transformer, o cache de embeddings e a configuração")
+    parser.add_argument("--fracao", type=float, default=0.1, help="fração de cada intent separada para teste")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--max-consultas", type=int, default=None,
+                        help="limita as consultas (amostra estratificada mantida)")
+    parser.add_argument("--sem-reconstruir", action="store_true",
+                        help="mede o artefato base como está (as consultas de teste estão no banco: acurácia otimista)")
+    parser.add_argument("--saida", default=None, help="JSON de resultado (padrão: resultados/recuperacao_<commit>.json)")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior usada como referência")
+    parser.add_argument("--tolerancia-acuracia", type=float, default=0.01, help="queda máxima, em pontos absolutos")
+    parser.add_argument("--tolerancia-latencia", type=float, default=0.25,
+                        help="piora relativa máxima do p95 e da vazão")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.15, help="aumento relativo máximo do pico de RSS")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dados):
+        print(f"❌ Dataset não encontrado: {args.dados}")
+        sys.exit(1)
+    if not os.path.isdir(args.artefato):
+        print(f"❌ Artefato base não encontrado: {args.artefato}")
+        sys.exit(1)
+
+    # input_text bruto nas consultas (o Chatbot é quem normaliza); normalizado no banco
+    bruto = pd.read_csv(args.dados, sep=';', encoding='utf-8')
+    bruto['input_text'] = bruto['input_text'].astype(str)
+    idx_teste, idx_treino = dividir_estratificado(bruto, args.fracao, args.semente)
+    if args.max_consultas is not None and len(idx_teste) > args.max_consultas:
+        # As consultas descartadas continuam fora do banco
+        sub, _ = dividir_estratificado(bruto.iloc[idx_teste].reset_index(drop=True),
+                                       args.max_consultas / len(idx_teste), args.semente)
+        idx_teste = idx_teste[sub]
+    teste = bruto.iloc[idx_teste]
+    print(f"🧪 {len(teste)} consultas de teste estratificadas em {teste['intent'].nunique()} intents "
+          f"({len(idx_treino)} linhas no banco)")
+
+    pasta_trabalho = tempfile.mkdtemp(prefix='avaliacao_recuperacao_')
+    try:
+        if args.sem_reconstruir:
+            print("⚠️ Medindo o artefato base sem reconstruir: as consultas de teste também estão no banco")
+            caminho_artefato = os.path.abspath(args.artefato)
+            from artefato import ler_manifesto
+            manifesto = ler_manifesto(caminho_artefato)
+            configuracao = {'indice': manifesto.get('indice'), 'precisao': manifesto.get('precisao', 'float32'),
+                            'votacao': manifesto.get('votacao') is not None}
+        else:
+            import Treino_ChatBot as treino
+            print("🏗️ Montando artefato de avaliação sem as consultas de teste...")
+            df_treino = bruto.iloc[idx_treino].reset_index(drop=True)
+            df_treino['input_text'] = treino.normalizar_serie(df_treino['input_text'])
+            caminho_artefato = os.path.join(pasta_trabalho, 'modelo_semantico')
+            configuracao = montar_artefato_avaliacao(df_treino, args.artefato, caminho_artefato)
+
+        caminho_consultas = os.path.join(pasta_trabalho, 'consultas.json')
+        with open(caminho_consultas, 'w', encoding='utf-8') as f:
+            json.dump({
+                'consultas': teste[['input_text', 'resposta', 'intent']].to_dict('records'),
+                'respostas_rejeicao': sorted(bruto.loc[bruto['intent'] == 'nao_entendido', 'resposta']
+                                             .astype(str).unique()),
+            }, f, ensure_ascii=False)
+
+        print("⏱️ Medindo get_response em um processo novo...")
+        metricas = medir(caminho_artefato, caminho_consultas)
+    finally:
+        shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+    commit = commit_atual()
+    resultado = {
+        'commit': commit,
+        'data': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'configuracao': {
+            'dados': os.path.basename(args.dados), 'fracao': args.fracao, 'semente': args.semente,
+            'max_consultas': args.max_consultas, 'reconstruido': not args.sem_reconstruir, **configuracao,
+        },
+        'metricas': metricas,
+    }
+
+    m = metricas
+    print(f"🎯 Acurácia top-1: {m['acuracia_top1']:.2%} | rejeição: {m['taxa_rejeicao']:.2%} | "
+          f"correspondência exata: {m['fracao_correspondencia_exata']:.2%}")
+    print(f"⏱️ Latência p50 {m['latencia_p50_ms']:.2f} ms | p95 {m['latencia_p95_ms']:.2f} ms | "
+          f"p99 {m['latencia_p99_ms']:.2f} ms | {m['vazao_consultas_s']:.1f} consultas/s")
+    if m['pico_rss_mb'] is not None:
+        print(f"🧠 Pico de RSS: {m['pico_rss_mb']:.1f} MiB")
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"recuperacao_{commit or 'sem_git'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado salvo em: {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            referencia = json.load(f)
+        if referencia.get('configuracao') != resultado['configuracao']:
+            print("⚠️ A referência foi medida com outra configuração; a comparação pode não ser justa")
+        tolerancias = {'acuracia': args.tolerancia_acuracia, 'latencia': args.tolerancia_latencia,
+                       'memoria': args.tolerancia_memoria}
+        regressoes = comparar(resultado, referencia, tolerancias)
+        for nome, anterior, atual in regressoes:
+            print(f"❌ Regressão em {nome}: {anterior:.4g} -> {atual:.4g} (referência {referencia.get('commit')})")
+        if regressoes:
+            sys.exit(1)
+        print(f"✅ Sem regressões em relação a {referencia.get('commit')}")
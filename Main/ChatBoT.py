@@ -1,19 +1,24 @@
 import sys
 import os
-import unicodedata
-import string
-import joblib
-import json
 import datetime
-import glob
-from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QFont, QColor, QTextCursor, QIcon
+from itertools import islice
+from PySide6.QtCore import (
+    Qt,
+    QTimer,
+    QElapsedTimer,
+    QPropertyAnimation,
+    QEasingCurve,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    Signal,
+)
+from PySide6.QtGui import QFont
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
     QVBoxLayout,
     QWidget,
-    QTextEdit,
     QLineEdit,
     QPushButton,
     QHBoxLayout,
@@ -25,95 +30,20 @@ from PySide6.QtWidgets import (
     QDialogButtonBox,
     QGraphicsOpacityEffect,
 )
-from sentence_transformers import util
+from motor_chatbot import Chatbot
+from contexto import EstadoConversa
+from artefato import ler_manifesto
+from armazem_sessoes import ArmazemSessoes
+from visao_chat import VisaoChat
 
 # --- PASTA PARA SALVAR HISTÓRICO ---
 PASTA_HISTORICO = "historico"
-os.makedirs(PASTA_HISTORICO, exist_ok=True)
 
-# ==========================================================
-# Função de pré-processamento
-# ==========================================================
-
-def preprocessar_texto(texto: str) -> str:
-    texto = texto.lower()
-    texto = "".join(
-        c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn"
-    )
-    texto = texto.translate(str.maketrans("", "", string.punctuation))
-    texto = " ".join(texto.split())
-    return texto
-
-# ==========================================================
-# Chatbot adaptado para carregar de .pkl
-# ==========================================================
-
-class Chatbot:
-    def __init__(self, caminho_modelo_pkl: str):
-        print("📂 Carregando modelo e dados do arquivo .pkl...")
-        dados = joblib.load(caminho_modelo_pkl)
-        self.modelo_st = dados['modelo']
-        self.embeddings_perguntas = dados['embeddings']
-        self.perguntas = dados['perguntas']
-        self.respostas = dados['respostas']
-
-    def get_response(self, entrada_usuario: str) -> str:
-        entrada_proc = preprocessar_texto(entrada_usuario)
-        embedding_usuario = self.modelo_st.encode(entrada_proc, convert_to_tensor=True)
-
-        similaridades = util.cos_sim(embedding_usuario, self.embeddings_perguntas)
-        indice_mais_proximo = int(similaridades.argmax())
-        confianca = float(similaridades.max())
-
-        if confianca < 0.65:
-            return "Desculpe, não entendi sua pergunta. Pode reformular?"
-        return self.respostas[indice_mais_proximo]
-
-# ==========================================================
-# Sistema de histórico: salvar, carregar e deletar sessões
-# ==========================================================
-
-def deletar_sessao(caminho_arquivo):
-    try:
-        os.remove(caminho_arquivo)
-        print(f"🗑️ Sessão removida: {caminho_arquivo}")
-        return True
-    except OSError as e:
-        print(f"❌ Erro ao remover sessão: {e}")
-        return False
-
-def listar_sessoes():
-    arquivos = glob.glob(os.path.join(PASTA_HISTORICO, "*.json"))
-    sessoes = []
-    for arquivo in arquivos:
-        try:
-            with open(arquivo, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                sessoes.append({
-                    'arquivo': arquivo,
-                    'id': dados['id'],
-                    'data': dados['data'],
-                    'conversas': dados['conversas']
-                })
-        except:
-            continue
-    return sorted(sessoes, key=lambda x: x['data'], reverse=True)
-
-def salvar_sessao(id_sessao, conversas):
-    dados = {
-        "id": id_sessao,
-        "data": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "conversas": conversas
-    }
-    nome_arquivo = f"{id_sessao}.json"
-    caminho_arquivo = os.path.join(PASTA_HISTORICO, nome_arquivo)
-    with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-    print(f"💾 Histórico salvo: {caminho_arquivo}")
-
-def carregar_sessao(caminho_arquivo):
-    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# --- ANIMAÇÃO DAS RESPOSTAS ---
+# Velocidade em caracteres por segundo; 0 mostra a resposta inteira de uma vez
+VELOCIDADE_ANIMACAO = 120
+# Um quadro a cada ~16 ms (60 Hz): o texto revelado depende do tempo decorrido, não do número de ticks
+INTERVALO_QUADRO_MS = 16
 
 # ==========================================================
 # Dialogo para escolher sessão de histórico
@@ -182,20 +112,92 @@ class SessaoItemWidget(QWidget):
         layout.addStretch()
         layout.addWidget(delete_button)
 
+# ==========================================================
+# Inferência fora da thread da GUI
+# ==========================================================
+
+class SinaisInferencia(QObject):
+    # (id_sessao, entrada, resposta, confianca, contexto)
+    resposta_pronta = Signal(str, str, str, float, object)
+    # (id_sessao, entrada, mensagem de erro)
+    falhou = Signal(str, str, str)
+
+class TarefaInferencia(QRunnable):
+    def __init__(self, chatbot, id_sessao, entrada, estado):
+        super().__init__()
+        self.chatbot = chatbot
+        self.id_sessao = id_sessao
+        self.entrada = entrada
+        self.estado = estado
+        self.sinais = SinaisInferencia()
+
+    def run(self):
+        try:
+            resposta, confianca = self.chatbot.responder(self.entrada, self.estado)
+        except Exception as e:
+            self.sinais.falhou.emit(self.id_sessao, self.entrada, str(e))
+        else:
+            self.sinais.resposta_pronta.emit(self.id_sessao, self.entrada, resposta, float(confianca),
+                                             dict(self.estado.contexto))
+
+class SinaisCarregamento(QObject):
+    carregado = Signal(object)
+    falhou = Signal(str)
+
+class TarefaCarregamento(QRunnable):
+    # Carrega o artefato (e o transformer, com torch) enquanto a janela já está na tela
+    def __init__(self, caminho_artefato):
+        super().__init__()
+        self.caminho_artefato = caminho_artefato
+        self.sinais = SinaisCarregamento()
+
+    def run(self):
+        try:
+            chatbot = Chatbot(self.caminho_artefato)
+        except Exception as e:
+            self.sinais.falhou.emit(str(e))
+        else:
+            self.sinais.carregado.emit(chatbot)
+
 # ==========================================================
 # Interface gráfica (GUI) — ChatbotWindow
 # ==========================================================
 
 class ChatbotWindow(QMainWindow):
-    def __init__(self, chatbot: Chatbot):
+    def __init__(self, chatbot: Chatbot = None, caminho_artefato=None, velocidade_animacao=VELOCIDADE_ANIMACAO):
         super().__init__()
         self.setWindowTitle("CHAT-GPT13")
         self.setGeometry(100, 100, 1000, 650)
 
         self.chatbot = chatbot
-        self.conversas = []
+        self.armazem = ArmazemSessoes(PASTA_HISTORICO)
+        self.itens_sidebar = {}
         self.id_sessao = f"sessao_{int(datetime.datetime.now().timestamp())}"
+        self.diario = None
+        # Slots e embeddings recentes da conversa; só a tarefa de inferência em curso mexe nele
+        self.estado = EstadoConversa()
+
+        # Animação das respostas, em trechos de palavras a cada quadro
         self.animating = False
+        self.velocidade_animacao = velocidade_animacao
+        self.relogio_animacao = QElapsedTimer()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(INTERVALO_QUADRO_MS)
+        self.timer.timeout.connect(self.mostrar_proximo_trecho)
+
+        # Sessões carregadas mostram só os turnos mais recentes; os anteriores
+        # são lidos do fim do diário conforme o usuário rola para cima
+        self.turnos_anteriores = None
+        self.linha_digitando = None
+
+        # Inferência roda em um pool de uma thread só (o modelo é usado em série);
+        # mensagens enviadas enquanto o bot responde ficam na fila
+        self.pool_inferencia = QThreadPool(self)
+        self.pool_inferencia.setMaxThreadCount(1)
+        self.tarefa_atual = None
+        self.fila_mensagens = []
+        self.sessoes_excluidas = set()
 
         # --- Painel lateral para histórico ---
         self.sidebar = QListWidget()
@@ -225,12 +227,12 @@ class ChatbotWindow(QMainWindow):
         self.titulo.setStyleSheet("font-size: 28px; color: #4A90E2; padding: 18px 0 10px 0; letter-spacing: 2px;")
 
         # --- Área do chat ---
-        self.chat_area = QTextEdit(self)
-        self.chat_area.setReadOnly(True)
+        self.chat_area = VisaoChat(self)
         font = QFont()
         font.setPointSize(15)
         self.chat_area.setFont(font)
         self.chat_area.setStyleSheet("background-color: #23272F; color: #E8EAED; border-radius: 16px; padding: 18px; margin: 0 0 8px 0;")
+        self.chat_area.chegou_ao_topo.connect(self.carregar_turnos_anteriores, Qt.ConnectionType.QueuedConnection)
         self.opacity_effect = QGraphicsOpacityEffect(self.chat_area)
         self.chat_area.setGraphicsEffect(self.opacity_effect)
 
@@ -271,27 +273,68 @@ class ChatbotWindow(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
-        self.chat_area.append(
-            f'<b><img src="resources/FazoL.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Companheiro:</b> '
-            "Olá! Sou seu assistente de fertilidade do solo. Como posso ajudar?<br>"
-        )
+        self.chat_area.adicionar('bot', "Olá! Sou seu assistente de fertilidade do solo. Como posso ajudar?")
 
         self.atualizar_sidebar()
 
+        # Sem um chatbot pronto, o modelo é carregado no pool de inferência; mensagens
+        # enviadas antes disso ficam na fila e são respondidas quando ele terminar
+        self.tarefa_carregamento = None
+        if self.chatbot is None:
+            self.input_field.setPlaceholderText("Carregando modelo… (pode digitar, as mensagens ficam na fila)")
+            self.tarefa_carregamento = TarefaCarregamento(caminho_artefato)
+            self.tarefa_carregamento.sinais.carregado.connect(self.modelo_carregado)
+            self.tarefa_carregamento.sinais.falhou.connect(self.falha_carregamento)
+            self.pool_inferencia.start(self.tarefa_carregamento)
+
+    def modelo_carregado(self, chatbot):
+        self.chatbot = chatbot
+        self.tarefa_carregamento = None
+        self.input_field.setPlaceholderText("Digite sua mensagem…")
+        self.processar_fila()
+
+    def falha_carregamento(self, erro):
+        self.tarefa_carregamento = None
+        self.input_field.setPlaceholderText("Modelo indisponível")
+        self.chat_area.adicionar('sistema', f"❌ Erro ao carregar o modelo: {erro}")
+
 
     def atualizar_sidebar(self):
+        # Montagem completa: só na abertura da janela. Depois disso a lista é
+        # mantida item a item por atualizar_sessao_sidebar / remover_sessao_sidebar.
         self.sidebar.clear()
+        self.itens_sidebar = {}
 
         new_chat_item = QListWidgetItem("➕ Nova Conversa")
         self.sidebar.addItem(new_chat_item)
         
-        sessoes = listar_sessoes()
-        for sessao in sessoes:
-            item = QListWidgetItem(self.sidebar)
-            widget = SessaoItemWidget(sessao, self.deletar_e_atualizar_sessao)
-            item.setSizeHint(widget.sizeHint())
-            item.setData(Qt.ItemDataRole.UserRole, sessao['arquivo']) 
-            self.sidebar.setItemWidget(item, widget)
+        for sessao in self.armazem.listar():
+            # Um id com dois arquivos (.json legado e diário) aparece uma vez, pelo mais recente
+            if sessao['id'] not in self.itens_sidebar:
+                self.inserir_sessao_sidebar(sessao, self.sidebar.count())
+
+    def inserir_sessao_sidebar(self, sessao, linha):
+        item = QListWidgetItem()
+        widget = SessaoItemWidget(sessao, self.deletar_e_atualizar_sessao)
+        item.setSizeHint(widget.sizeHint())
+        item.setData(Qt.ItemDataRole.UserRole, sessao['arquivo']) 
+        self.sidebar.insertItem(linha, item)
+        self.sidebar.setItemWidget(item, widget)
+        # Chaveado pelo id: o arquivo muda quando um .json legado vira diário .jsonl
+        self.itens_sidebar[sessao['id']] = item
+
+    def remover_sessao_sidebar(self, id_sessao):
+        item = self.itens_sidebar.pop(id_sessao, None)
+        if item is not None:
+            self.sidebar.takeItem(self.sidebar.row(item))
+
+    def atualizar_sessao_sidebar(self, id_sessao):
+        # A sessão recém-salva é a mais recente: vai para o topo, logo abaixo de "Nova Conversa"
+        sessao = self.armazem.obter(id_sessao)
+        if sessao is None:
+            return
+        self.remover_sessao_sidebar(id_sessao)
+        self.inserir_sessao_sidebar(sessao, 1)
 
     def deletar_e_atualizar_sessao(self, caminho_arquivo):
         confirm = QMessageBox.question(self, "Confirmar Exclusão", 
@@ -300,13 +343,24 @@ class ChatbotWindow(QMainWindow):
                                       QMessageBox.StandardButton.No)
         
         if confirm == QMessageBox.StandardButton.Yes:
-            if deletar_sessao(caminho_arquivo):
-                if self.conversas and self.id_sessao in caminho_arquivo:
-                    self.id_sessao = f"sessao_{int(datetime.datetime.now().timestamp())}"
-                    self.conversas = []
-                    self.recarregar_conversas()
-                    self.chat_area.append('<i>🗑️ Sessão atual excluída. Nova conversa iniciada.</i><br>')
-                self.atualizar_sidebar()
+            id_sessao = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+            sessao_atual = id_sessao == self.id_sessao
+            if sessao_atual:
+                self.fechar_diario()
+            try:
+                self.armazem.deletar(caminho_arquivo)
+                print(f"🗑️ Sessão removida: {caminho_arquivo}")
+            except OSError as e:
+                print(f"❌ Erro ao remover sessão: {e}")
+                return
+            # Mensagens ainda na fila não recriam a sessão excluída
+            self.sessoes_excluidas.add(id_sessao)
+            self.fila_mensagens = [m for m in self.fila_mensagens if m['id_sessao'] != id_sessao]
+            if sessao_atual:
+                self.trocar_sessao(f"sessao_{int(datetime.datetime.now().timestamp())}")
+                self.chat_area.limpar()
+                self.chat_area.adicionar('sistema', '🗑️ Sessão atual excluída. Nova conversa iniciada.')
+            self.remover_sessao_sidebar(id_sessao)
         
 
     def carregar_sessao_sidebar(self, item):
@@ -325,19 +379,14 @@ class ChatbotWindow(QMainWindow):
             return
 
         if "Nova Conversa" in item.text():
-            self.id_sessao = f"sessao_{int(datetime.datetime.now().timestamp())}"
-            self.conversas = []
-            self.recarregar_conversas()
-            self.chat_area.append('<i>🆕 Nova conversa iniciada.</i><br>')
+            self.trocar_sessao(f"sessao_{int(datetime.datetime.now().timestamp())}")
+            self.chat_area.limpar()
+            self.chat_area.adicionar('sistema', '🆕 Nova conversa iniciada.')
         
     def finalizar_carregamento_com_fade_in(self, arquivo):
         if arquivo:
-            dados = carregar_sessao(arquivo)
-            self.id_sessao = dados['id']
-            self.conversas = dados['conversas']
-            self.recarregar_conversas()
-            self.chat_area.append(f"<i>🕒 Histórico carregado da sessão: {self.id_sessao}</i><br>")
-            
+            self.abrir_sessao(arquivo)
+
             # Animação de fade-in
             self.fade_in_animation = QPropertyAnimation(self.opacity_effect, b"opacity")
             self.fade_in_animation.setDuration(300)
@@ -347,114 +396,221 @@ class ChatbotWindow(QMainWindow):
             self.fade_in_animation.start()
 
     def carregar_historico(self):
-        sessoes = listar_sessoes()
+        sessoes = self.armazem.listar()
         if not sessoes:
             return
         dlg = EscolherSessaoDialog(sessoes, self)
         if dlg.exec() == QDialog.DialogCode.Accepted:
             arquivo = dlg.get_selecao()
             if arquivo:
-                dados = carregar_sessao(arquivo)
-                self.id_sessao = dados['id']
-                self.conversas = dados['conversas']
-                self.recarregar_conversas()
-                self.chat_area.append(f"<i>🕒 Histórico carregado da sessão: {self.id_sessao}</i><br>")
-        self.atualizar_sidebar()
-
-    def recarregar_conversas(self):
-        self.chat_area.clear()
-        for c in self.conversas:
-            user_html = f'<p><b><img src="resources/MelhorPresidente.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Você:</b> {c["entrada"]}</p>'
-            bot_html = f'<p><b><img src="resources/FazoL.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Companheiro:</b> {c["resposta"]}</p>'
-            self.chat_area.append(user_html)
-            self.chat_area.append(bot_html)
-
-    def send_message(self):
+                self.abrir_sessao(arquivo)
+
+    def trocar_sessao(self, id_sessao):
+        # Fecha o diário da sessão anterior (fsync dos turnos pendentes) e esquece a paginação dela
+        self.fechar_diario()
+        self.turnos_anteriores = None
+        self.chat_area.ha_anteriores = False
+        self.linha_digitando = None
         if self.animating:
+            # A animação pertence à conversa anterior, que vai sair da tela
+            self.timer.stop()
+            self.animating = False
+        self.id_sessao = id_sessao
+        # Estado novo: uma tarefa ainda rodando (ou na fila) para a sessão anterior segue com o dela
+        self.estado = EstadoConversa()
+        for mensagem in self.fila_mensagens:
+            mensagem['na_tela'] = False
+
+    def fechar_diario(self):
+        if self.diario is not None:
+            self.diario.fechar()
+            self.diario = None
+
+    def abrir_sessao(self, arquivo):
+        # Só o cabeçalho e a última página de turnos são lidos aqui
+        if not os.path.exists(arquivo):
+            # Arquivo trocado desde que a lista foi montada (ex.: .json legado convertido): procura pelo id
+            id_sessao = os.path.splitext(os.path.basename(arquivo))[0]
+            sessao = self.armazem.obter(id_sessao)
+            if sessao is None or not os.path.exists(sessao['arquivo']):
+                self.remover_sessao_sidebar(id_sessao)
+                self.chat_area.adicionar('sistema', f"❌ Sessão não encontrada no histórico: {id_sessao}")
+                return
+            arquivo = sessao['arquivo']
+        try:
+            cabecalho = self.armazem.ler_cabecalho(arquivo)
+        except (OSError, ValueError, KeyError) as e:
+            self.chat_area.adicionar('sistema', f"❌ Erro ao abrir a sessão: {e}")
             return
+        self.trocar_sessao(cabecalho['id'])
+        self.chat_area.limpar()
+        self.turnos_anteriores = self.armazem.iterar_turnos_do_fim(arquivo)
+        pagina = self.carregar_turnos_anteriores()
+        if pagina:
+            # O turno mais recente vem primeiro e traz o contexto acumulado até ali
+            self.estado.retomar(pagina[0].get('contexto'))
+        self.chat_area.adicionar('sistema', f"🕒 Histórico carregado da sessão: {self.id_sessao}")
+
+    def carregar_turnos_anteriores(self, tamanho_pagina=50):
+        if self.turnos_anteriores is None:
+            return
+        pagina = list(islice(self.turnos_anteriores, tamanho_pagina))
+        if len(pagina) < tamanho_pagina:
+            self.turnos_anteriores = None
+        self.chat_area.ha_anteriores = self.turnos_anteriores is not None
+        if self.linha_digitando is not None:
+            self.linha_digitando += 2 * len(pagina)
+        if self.animating:
+            self.linha_animada += 2 * len(pagina)
+        self.chat_area.adicionar_turnos_no_inicio(pagina[::-1])
+        return pagina
 
+    def send_message(self):
         user_input = self.input_field.text().strip()
         if not user_input:
             return
 
         if user_input.lower() == "sair":
-            salvar_sessao(self.id_sessao, self.conversas)
             self.close()
             return
 
         self.input_field.clear()
+        # A mensagem aparece na hora, mesmo com o modelo carregando ou outra resposta em curso
+        self.chat_area.adicionar('usuario', user_input)
+        self.fila_mensagens.append({'id_sessao': self.id_sessao, 'estado': self.estado, 'entrada': user_input,
+                                    'na_tela': True})
+        self.processar_fila()
+
+    def processar_fila(self):
+        # A animação da resposta anterior não bloqueia a próxima mensagem
+        if self.chatbot is None or self.tarefa_atual is not None:
+            return
 
-        user_html = f'<p><b><img src="resources/MelhorPresidente.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Você:</b> {user_input}</p>'
-        self.chat_area.append(user_html)
-
-        # Animação de "digitando..."
-        self.chat_area.append(f'<b><img src="resources/FazoL.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Companheiro:</b> ...')
-        QApplication.processEvents()
-        
-        # Simula um "pensamento" e obtém a resposta
-        QTimer.singleShot(300, lambda: self.obter_e_mostrar_resposta(user_input))
-
-    def obter_e_mostrar_resposta(self, user_input):
-        # Remove o indicador "..."
-        cursor = self.chat_area.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.select(QTextCursor.SelectionType.BlockUnderCursor)
-        cursor.removeSelectedText()
-        self.chat_area.setTextCursor(cursor)
-        
-        # Obtém e salva a resposta
-        resposta = self.chatbot.get_response(user_input)
-        self.conversas.append({'entrada': user_input, 'resposta': resposta})
-
-        # Exibe a resposta com animação
-        bot_prefix = f'<b><img src="resources/FazoL.png" width="36" height="36" style="border-radius: 18px; vertical-align: middle;"> Companheiro:</b> '
-        self.chat_area.append(bot_prefix)
-        self.anime_texto(resposta)
+        if not self.fila_mensagens:
+            return
+        # Mensagens de uma sessão que já saiu da tela são respondidas com o estado dela
+        # e vão para o diário dela; só a exibição é pulada
+        mensagem = self.fila_mensagens.pop(0)
+        if mensagem['id_sessao'] == self.id_sessao:
+            if not mensagem['na_tela']:
+                # A sessão foi reaberta depois do envio e a área do chat, recarregada do diário
+                self.chat_area.adicionar('usuario', mensagem['entrada'])
+            # Indicador "digitando..." fica visível exatamente enquanto a inferência roda;
+            # a mesma linha recebe a resposta depois
+            self.linha_digitando = self.chat_area.adicionar('bot', "digitando...")
+
+        self.tarefa_atual = TarefaInferencia(self.chatbot, mensagem['id_sessao'], mensagem['entrada'],
+                                             mensagem['estado'])
+        self.tarefa_atual.sinais.resposta_pronta.connect(self.obter_e_mostrar_resposta)
+        self.tarefa_atual.sinais.falhou.connect(self.mostrar_erro_inferencia)
+        self.pool_inferencia.start(self.tarefa_atual)
+
+    def remover_indicador_digitando(self):
+        if self.linha_digitando is not None:
+            self.chat_area.remover(self.linha_digitando)
+            self.linha_digitando = None
+
+    def registrar_turno(self, id_sessao, turno):
+        if id_sessao != self.id_sessao:
+            # Resposta de uma sessão que já saiu da tela: o diário dela é aberto só para este turno
+            diario = self.armazem.abrir_diario(id_sessao)
+            diario.registrar_turno(turno)
+            diario.fechar()
+            return
+        if self.diario is None:
+            self.diario = self.armazem.abrir_diario(self.id_sessao)
+        self.diario.registrar_turno(turno)
+
+    def obter_e_mostrar_resposta(self, id_sessao, user_input, resposta, confianca, contexto):
+        self.tarefa_atual = None
+        if id_sessao in self.sessoes_excluidas and id_sessao != self.id_sessao:
+            # A sessão foi excluída durante a inferência: não é recriada por esta resposta
+            self.processar_fila()
+            return
 
-    def anime_texto(self, texto):
+        # Cada turno vai para o diário da sessão assim que acontece, mesmo após uma troca de sessão
+        self.registrar_turno(id_sessao, {'entrada': user_input, 'resposta': resposta, 'confianca': confianca,
+                                         'contexto': contexto})
+        self.atualizar_sessao_sidebar(id_sessao)
+
+        if id_sessao == self.id_sessao:
+            # Exibe a resposta com animação na linha do indicador
+            linha, self.linha_digitando = self.linha_digitando, None
+            if linha is None:
+                # Sessão reaberta durante a inferência: a pergunta ainda não estava no diário
+                self.chat_area.adicionar('usuario', user_input)
+                linha = self.chat_area.adicionar('bot', "")
+            self.anime_texto(linha, resposta)
+        self.processar_fila()
+
+    def mostrar_erro_inferencia(self, id_sessao, user_input, erro):
+        self.tarefa_atual = None
+        if id_sessao == self.id_sessao:
+            self.remover_indicador_digitando()
+            self.chat_area.adicionar('sistema', f"❌ Erro ao gerar resposta: {erro}")
+        self.processar_fila()
+
+    def anime_texto(self, linha, texto):
+        # Uma resposta nova encerra a animação anterior, que é mostrada inteira
+        if self.animating:
+            self.concluir_animacao()
+        if not self.velocidade_animacao:
+            self.chat_area.definir_texto(linha, texto)
+            return
         self.animating = True
         self.index = 0
+        self.linha_animada = linha
         self.texto_anime = texto
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.mostrar_proximo_char)
-        self.timer.start(25)
-
-    def mostrar_proximo_char(self):
-        if self.index < len(self.texto_anime):
-            cursor = self.chat_area.textCursor()
-            cursor.movePosition(QTextCursor.MoveOperation.End)
-            cursor.insertText(self.texto_anime[self.index])
-            self.chat_area.setTextCursor(cursor)
-            self.index += 1
-        else:
-            self.chat_area.append("<br>") # Adiciona quebra de linha no final
-            self.timer.stop()
-            self.animating = False
-            self.atualizar_sidebar()
+        self.chat_area.definir_texto(linha, "")
+        self.relogio_animacao.start()
+        self.timer.start()
+
+    def mostrar_proximo_trecho(self):
+        alvo = int(self.relogio_animacao.elapsed() * self.velocidade_animacao / 1000)
+        if alvo >= len(self.texto_anime):
+            self.concluir_animacao()
+            return
+        # Revela palavras inteiras: avança até o próximo espaço
+        fim_palavra = self.texto_anime.find(" ", alvo)
+        alvo = len(self.texto_anime) if fim_palavra == -1 else fim_palavra
+        if alvo > self.index:
+            self.index = alvo
+            self.chat_area.definir_texto(self.linha_animada, self.texto_anime[:alvo])
+
+    def concluir_animacao(self):
+        self.timer.stop()
+        self.animating = False
+        self.chat_area.definir_texto(self.linha_animada, self.texto_anime)
+
+    def closeEvent(self, event):
+        if self.diario is not None:
+            print(f"💾 Histórico salvo: {self.diario.arquivo}")
+        self.fechar_diario()
+        self.armazem.fechar()
+        super().closeEvent(event)
 
 # ==========================================================
-# Execução principal usando modelo .pkl
+# Execução principal usando o artefato do modelo
 # ==========================================================
 
 if __name__ == "__main__":
-    caminho_pkl = r"C:\Users\zCarlin\Desktop\ChatBot-Teste-main\ChatBot-Teste-main\modelo_semantico.pkl"
+    caminho_artefato = r"C:\Users\zCarlin\Desktop\ChatBot-Teste-main\ChatBot-Teste-main\modelo_semantico"
 
-    # Teste de carregamento do .pkl isolado
-    try:
-        print("🔎 Testando carregamento do modelo .pkl...")
-        dados_teste = joblib.load(caminho_pkl)
-        print("✅ Arquivo .pkl carregado com sucesso!")
-    except Exception as e:
-        print(f"❌ Erro ao carregar o arquivo .pkl: {e}")
+    if not os.path.isdir(caminho_artefato):
+        print(f"❌ Artefato do modelo não encontrado: {caminho_artefato}")
         sys.exit(1)
 
-    if not os.path.exists(caminho_pkl):
-        print(f"❌ Arquivo .pkl não encontrado: {caminho_pkl}")
+    # Validação rápida: só lê o manifesto, sem carregar o modelo
+    try:
+        print("🔎 Verificando manifesto do artefato...")
+        manifesto = ler_manifesto(caminho_artefato)
+        print(f"✅ Artefato v{manifesto['versao_formato']} com {manifesto['n_perguntas']} perguntas")
+    except Exception as e:
+        print(f"❌ Erro ao ler o artefato: {e}")
         sys.exit(1)
 
-    chatbot_backend = Chatbot(caminho_pkl)
-
+    # O modelo é carregado em segundo plano: a janela aparece antes
     app = QApplication(sys.argv)
-    window = ChatbotWindow(chatbot_backend)
+    window = ChatbotWindow(caminho_artefato=caminho_artefato)
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import sqlite3
+import datetime
+
+# ==========================================================
+# Armazém de sessões: diário append-only + índice de metadados em SQLite
+# ==========================================================
+# Cada sessão é um diário JSON Lines em historico/<id>.jsonl:
+#   {"tipo": "cabecalho", "id": "...", "data": "..."}
+#   {"tipo": "turno", "entrada": "...", "resposta": "...", ...}
+#   ...
+# Cada turno é gravado assim que acontece (fsync em lotes), então um crash perde no
+# máximo os últimos turnos ainda não sincronizados. A compactação reescreve o diário
+# em um arquivo temporário e troca por rename atômico, descartando uma linha final
+# cortada por um crash e atualizando a data do cabeçalho.
+#
+# Sessões antigas em historico/<id>.json (JSON único com "conversas") continuam
+# legíveis e são convertidas para .jsonl quando recebem um turno novo.
+#
+# O índice (historico/indice_sessoes.sqlite) guarda id, data, número de turnos e o
+# mtime do arquivo, então listar sessões não precisa abrir nenhum arquivo de sessão.
+
+ARQUIVO_INDICE = "indice_sessoes.sqlite"
+EXTENSAO_DIARIO = ".jsonl"
+EXTENSAO_LEGADO = ".json"
+
+def _agora():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _linha_json(registro):
+    return (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _reescrever_atomico(caminho, linhas):
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        for linha in linhas:
+            f.write(linha)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+# ==========================================================
+# Leitura preguiçosa
+# ==========================================================
+
+def ler_cabecalho(arquivo):
+    if arquivo.endswith(EXTENSAO_LEGADO):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        return {"id": dados["id"], "data": dados["data"]}
+    with open(arquivo, "rb") as f:
+        cabecalho = json.loads(f.readline())
+    if cabecalho.get("tipo") != "cabecalho":
+        raise ValueError(f"Diário sem cabeçalho: {arquivo}")
+    return cabecalho
+
+def iterar_turnos(arquivo):
+    # Gera os turnos um a um, sem carregar o diário inteiro.
+    # Uma linha final incompleta (crash no meio da escrita) é ignorada.
+    if arquivo.endswith(EXTENSAO_LEGADO):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            yield from json.load(f)["conversas"]
+        return
+    with open(arquivo, "rb") as f:
+        f.readline()
+        for linha in f:
+            turno = _ler_turno(linha)
+            if turno is not None:
+                yield turno
+
+def iterar_turnos_do_fim(arquivo, tamanho_bloco=1 << 16):
+    # Gera os turnos do mais recente para o mais antigo, lendo o diário em blocos a partir do fim.
+    # O arquivo é reaberto a cada bloco para não ficar preso enquanto a interface pagina.
+    if arquivo.endswith(EXTENSAO_LEGADO):
+        yield from reversed(list(iterar_turnos(arquivo)))
+        return
+    with open(arquivo, "rb") as f:
+        inicio_turnos = len(f.readline())
+        posicao = f.seek(0, os.SEEK_END)
+    resto = b""
+    while posicao > inicio_turnos:
+        n = min(tamanho_bloco, posicao - inicio_turnos)
+        posicao -= n
+        with open(arquivo, "rb") as f:
+            f.seek(posicao)
+            linhas = (f.read(n) + resto).split(b"\n")
+        # A primeira linha do bloco pode estar incompleta: fica para o próximo bloco
+        resto = linhas.pop(0)
+        for linha in reversed(linhas):
+            turno = _ler_turno(linha)
+            if turno is not None:
+                yield turno
+    turno = _ler_turno(resto)
+    if turno is not None:
+        yield turno
+
+def _ler_turno(linha):
+    # None para linhas vazias ou cortadas (crash no meio da escrita)
+    try:
+        registro = json.loads(linha)
+    except ValueError:
+        return None
+    if not isinstance(registro, dict) or registro.pop("tipo", None) != "turno":
+        return None
+    return registro
+
+def _contar_turnos(arquivo):
+    if arquivo.endswith(EXTENSAO_LEGADO):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            return len(json.load(f)["conversas"])
+    with open(arquivo, "rb") as f:
+        f.readline()
+        return sum(1 for linha in f if linha.endswith(b"\n"))
+
+def _termina_com_quebra(arquivo):
+    with open(arquivo, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+# ==========================================================
+# Diário de uma sessão aberta para escrita
+# ==========================================================
+
+class DiarioSessao:
+    def __init__(self, armazem, id_sessao, arquivo, n_turnos, fsync_a_cada=8, intervalo_fsync=2.0,
+                 compactar_a_cada=500):
+        self.armazem = armazem
+        self.id_sessao = id_sessao
+        self.arquivo = arquivo
+        self.n_turnos = n_turnos
+        self.fsync_a_cada = fsync_a_cada
+        self.intervalo_fsync = intervalo_fsync
+        self.compactar_a_cada = compactar_a_cada
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+        self._desde_compactacao = 0
+        self._arquivo = open(arquivo, "ab")
+
+    def registrar_turno(self, turno):
+        self._arquivo.write(_linha_json({"tipo": "turno", **turno}))
+        self._arquivo.flush()
+        self.n_turnos += 1
+        self._pendentes += 1
+        self._desde_compactacao += 1
+        if self._pendentes >= self.fsync_a_cada or time.monotonic() - self._ultimo_fsync >= self.intervalo_fsync:
+            self.sincronizar_disco()
+        if self.compactar_a_cada and self._desde_compactacao >= self.compactar_a_cada:
+            self.compactar()
+
+    def sincronizar_disco(self):
+        if self._pendentes:
+            os.fsync(self._arquivo.fileno())
+            self._pendentes = 0
+            # O índice acompanha o diário no ritmo dos fsyncs, e não a cada turno: cada commit
+            # do SQLite custa seus próprios fsyncs (um sincronizar() refaz a linha após um crash)
+            self.armazem._registrar(self.arquivo, self.id_sessao, _agora(), self.n_turnos)
+            self.armazem.conexao.commit()
+        self._ultimo_fsync = time.monotonic()
+
+    def compactar(self):
+        self.sincronizar_disco()
+        self._arquivo.close()
+        self.armazem.compactar(self.arquivo)
+        self._arquivo = open(self.arquivo, "ab")
+        self._desde_compactacao = 0
+
+    def fechar(self):
+        if self._arquivo.closed:
+            return
+        self.sincronizar_disco()
+        self._arquivo.close()
+
+# ==========================================================
+# Armazém
+# ==========================================================
+
+class ArmazemSessoes:
+    def __init__(self, pasta="historico"):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self.conexao = sqlite3.connect(os.path.join(pasta, ARQUIVO_INDICE))
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS sessoes ("
+            " arquivo TEXT PRIMARY KEY,"
+            " id TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " n_turnos INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL)"
+        )
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS sessoes_data ON sessoes (data)")
+        # obter() procura pelo id a cada resposta gravada: sem índice, varreria a tabela inteira
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS sessoes_id ON sessoes (id)")
+        self.conexao.commit()
+        self.sincronizar()
+
+    def _caminho(self, id_sessao):
+        return os.path.join(self.pasta, f"{id_sessao}{EXTENSAO_DIARIO}")
+
+    def _registrar(self, arquivo, id_sessao, data, n_turnos):
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO sessoes (arquivo, id, data, n_turnos, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+            (arquivo, id_sessao, data, n_turnos, os.stat(arquivo).st_mtime_ns),
+        )
+
+    def sincronizar(self):
+        conhecidos = dict(self.conexao.execute("SELECT arquivo, mtime_ns FROM sessoes"))
+        presentes = set()
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if not entrada.name.endswith((EXTENSAO_DIARIO, EXTENSAO_LEGADO)) or not entrada.is_file():
+                    continue
+                arquivo = os.path.join(self.pasta, entrada.name)
+                presentes.add(arquivo)
+                mtime_ns = entrada.stat().st_mtime_ns
+                if conhecidos.get(arquivo) == mtime_ns:
+                    continue
+                try:
+                    cabecalho = ler_cabecalho(arquivo)
+                    n_turnos = _contar_turnos(arquivo)
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+                # Diários: a data de última atividade é o mtime do arquivo
+                data = cabecalho["data"]
+                if arquivo.endswith(EXTENSAO_DIARIO):
+                    data = max(data, datetime.datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S"))
+                self._registrar(arquivo, cabecalho["id"], data, n_turnos)
+
+        removidos = [(a,) for a in conhecidos if a not in presentes]
+        self.conexao.executemany("DELETE FROM sessoes WHERE arquivo = ?", removidos)
+        self.conexao.commit()
+
+    def _como_dict(self, linha):
+        arquivo, id_sessao, data, n_turnos = linha
+        return {'arquivo': arquivo, 'id': id_sessao, 'data': data, 'n_turnos': n_turnos}
+
+    def listar(self):
+        cursor = self.conexao.execute("SELECT arquivo, id, data, n_turnos FROM sessoes ORDER BY data DESC")
+        return [self._como_dict(linha) for linha in cursor]
+
+    def obter(self, id_sessao):
+        linha = self.conexao.execute(
+            "SELECT arquivo, id, data, n_turnos FROM sessoes WHERE id = ? ORDER BY data DESC", (id_sessao,)
+        ).fetchone()
+        return self._como_dict(linha) if linha else None
+
+    def abrir_diario(self, id_sessao, **opcoes):
+        # Abre (ou cria) o diário da sessão para acrescentar turnos
+        arquivo = self._caminho(id_sessao)
+        legado = os.path.join(self.pasta, f"{id_sessao}{EXTENSAO_LEGADO}")
+        if not os.path.exists(arquivo) and os.path.exists(legado):
+            self.compactar(legado)
+        elif os.path.exists(arquivo) and not _termina_com_quebra(arquivo):
+            # Linha cortada por um crash: limpa antes de acrescentar, senão o próximo turno colaria nela
+            self.compactar(arquivo)
+        if os.path.exists(arquivo):
+            n_turnos = _contar_turnos(arquivo)
+        else:
+            data = _agora()
+            _reescrever_atomico(arquivo, [_linha_json({"tipo": "cabecalho", "id": id_sessao, "data": data})])
+            n_turnos = 0
+            # Já listada (e encontrada por obter) antes do primeiro fsync de turnos
+            self._registrar(arquivo, id_sessao, data, n_turnos)
+            self.conexao.commit()
+        return DiarioSessao(self, id_sessao, arquivo, n_turnos, **opcoes)
+
+    def salvar(self, id_sessao, conversas):
+        # Reescrita completa (atômica) de uma sessão
+        arquivo = self._caminho(id_sessao)
+        data = _agora()
+        linhas = [_linha_json({"tipo": "cabecalho", "id": id_sessao, "data": data})]
+        linhas.extend(_linha_json({"tipo": "turno", **turno}) for turno in conversas)
+        _reescrever_atomico(arquivo, linhas)
+        self._registrar(arquivo, id_sessao, data, len(conversas))
+        self.conexao.commit()
+        return arquivo
+
+    def compactar(self, arquivo):
+        # Reescreve o diário em forma canônica (ou converte um .json legado) via rename atômico
+        cabecalho = ler_cabecalho(arquivo)
+        turnos = list(iterar_turnos(arquivo))
+        destino = self._caminho(cabecalho["id"])
+        data = _agora()
+        linhas = [_linha_json({"tipo": "cabecalho", "id": cabecalho["id"], "data": data})]
+        linhas.extend(_linha_json({"tipo": "turno", **turno}) for turno in turnos)
+        _reescrever_atomico(destino, linhas)
+        if destino != arquivo:
+            os.remove(arquivo)
+            self.conexao.execute("DELETE FROM sessoes WHERE arquivo = ?", (arquivo,))
+        self._registrar(destino, cabecalho["id"], data, len(turnos))
+        self.conexao.commit()
+        return destino
+
+    def carregar(self, arquivo):
+        # Carrega a sessão inteira; prefira iterar_turnos para sessões longas
+        cabecalho = ler_cabecalho(arquivo)
+        return {"id": cabecalho["id"], "data": cabecalho["data"], "conversas": list(iterar_turnos(arquivo))}
+
+    def iterar_turnos(self, arquivo):
+        return iterar_turnos(arquivo)
+
+    def iterar_turnos_do_fim(self, arquivo):
+        return iterar_turnos_do_fim(arquivo)
+
+    def ler_cabecalho(self, arquivo):
+        return ler_cabecalho(arquivo)
+
+    def deletar(self, arquivo):
+        os.remove(arquivo)
+        self.conexao.execute("DELETE FROM sessoes WHERE arquivo = ?", (arquivo,))
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
@@ -0,0 +1,380 @@
+import os
+import json
+import shutil
+import struct
+import datetime
+import numpy as np
+from indice_semantico import MatrizQuantizada, construir_indice, quantizar
+from votacao import codificar_rotulos
+
+# ==========================================================
+# Artefato do modelo semântico em diretório versionado
+# ==========================================================
+# modelo_semantico/
+#   manifesto.json        versão do formato, contagens e metadados
+#   transformer/          SentenceTransformer no formato nativo (modelo_st.save)
+#   embeddings.npy        float32 L2-normalizado, aberto com mmap_mode='r'
+#   perguntas.bin/.idx    tabela de strings UTF-8 + offsets int64
+#   respostas.bin/.idx
+#   resposta_ids.npy      (opcional) id int32 da resposta de cada linha, para a votação top-k
+#   intent_ids.npy        (opcional) id int32 da intent de cada linha; nomes em manifesto["intents"]
+#   indice.json           tipo e parâmetros escalares do backend de recuperação
+#   indice_<nome>.npy     arrays do índice, também abertos com mmap
+#   embeddings_<precisao>.npy + embeddings_escala.npy
+#                         (opcional) cópia compacta float16/int8 usada na pontuação;
+#                         o embeddings.npy float32 fica para o re-rank dos top-k
+#   textos_hash.npy       (opcional) hash uint64 de cada input_text distinto do CSV
+#   textos_embeddings.npy (opcional) embedding de cada um desses textos, para builds incrementais;
+#                         sem ele (build em streaming), textos_hash.npy tem uma linha por
+#                         pergunta e os embeddings do cache são os do próprio embeddings.npy
+
+VERSAO_FORMATO = 1
+ARQUIVO_MANIFESTO = "manifesto.json"
+# Onde o Treino grava e os pontos de entrada procuram o artefato (relativo à pasta atual)
+CAMINHO_ARTEFATO = "modelo_semantico"
+
+# ==========================================================
+# Arrays e tabelas de strings gravados aos blocos
+# ==========================================================
+
+class ArrayIncremental:
+    # .npy escrito bloco a bloco, sem conhecer o total de linhas de antemão: o cabeçalho
+    # tem tamanho fixo e é regravado com o shape final no fechamento.
+    TAMANHO_CABECALHO = 128
+
+    def __init__(self, caminho, dtype, colunas=None):
+        self.caminho = caminho
+        self.dtype = np.dtype(dtype)
+        self.colunas = colunas
+        self.linhas = 0
+        self._arquivo = open(caminho, "wb")
+        self._escrever_cabecalho()
+
+    def _escrever_cabecalho(self):
+        shape = (self.linhas,) if self.colunas is None else (self.linhas, self.colunas)
+        texto = repr({"descr": self.dtype.str, "fortran_order": False, "shape": shape})
+        tamanho = self.TAMANHO_CABECALHO - 10
+        self._arquivo.seek(0)
+        self._arquivo.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", tamanho)
+                            + texto.encode("latin1").ljust(tamanho - 1) + b"\n")
+        self._arquivo.seek(0, os.SEEK_END)
+
+    def adicionar(self, bloco):
+        bloco = np.ascontiguousarray(bloco, dtype=self.dtype)
+        if bloco.shape[1:] != (() if self.colunas is None else (self.colunas,)):
+            raise ValueError(f"Bloco com shape {bloco.shape} em {os.path.basename(self.caminho)}")
+        self._arquivo.write(bloco.tobytes())
+        self.linhas += len(bloco)
+
+    def ler(self, linhas):
+        # Linhas já gravadas, lidas de volta do disco antes do fechamento
+        linhas = np.asarray(linhas, dtype=np.int64)
+        forma = () if self.colunas is None else (self.colunas,)
+        if not len(linhas):
+            return np.empty((0,) + forma, dtype=self.dtype)
+        self._arquivo.flush()
+        mapa = np.memmap(self.caminho, dtype=self.dtype, mode="r", offset=self.TAMANHO_CABECALHO,
+                         shape=(self.linhas,) + forma)
+        valores = np.array(mapa[linhas])
+        del mapa
+        return valores
+
+    def fechar(self):
+        self._escrever_cabecalho()
+        self._arquivo.close()
+
+class TabelaStringsIncremental:
+    def __init__(self, caminho_base):
+        self._dados = open(caminho_base + ".bin", "wb")
+        self._offsets = ArrayIncremental(caminho_base + ".idx.npy", np.int64)
+        self._offsets.adicionar([0])
+        self._fim = 0
+
+    def __len__(self):
+        return self._offsets.linhas - 1
+
+    def adicionar(self, textos):
+        codificados = [str(texto).encode("utf-8") for texto in textos]
+        self._dados.write(b"".join(codificados))
+        fins = self._fim + np.cumsum(np.fromiter(map(len, codificados), dtype=np.int64, count=len(codificados)))
+        self._offsets.adicionar(fins)
+        if len(fins):
+            self._fim = int(fins[-1])
+
+    def fechar(self):
+        self._dados.close()
+        self._offsets.fechar()
+
+def salvar_tabela_strings(caminho_base, textos, tamanho_bloco=65536):
+    tabela = TabelaStringsIncremental(caminho_base)
+    bloco = []
+    for texto in textos:
+        bloco.append(texto)
+        if len(bloco) == tamanho_bloco:
+            tabela.adicionar(bloco)
+            bloco = []
+    tabela.adicionar(bloco)
+    tabela.fechar()
+    return len(tabela)
+
+class TabelaStrings:
+    # Decodifica cada string só quando ela é acessada; os bytes ficam no page cache do SO.
+
+    def __init__(self, caminho_base):
+        self.offsets = np.load(caminho_base + ".idx.npy", mmap_mode="r")
+        if os.path.getsize(caminho_base + ".bin") > 0:
+            self.dados = np.memmap(caminho_base + ".bin", dtype=np.uint8, mode="r")
+        else:
+            self.dados = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.dados[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+# ==========================================================
+# Escrita e leitura do artefato
+# ==========================================================
+
+def _normalizar(embeddings):
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    normas = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return embeddings / normas
+
+def _criar_temporaria(pasta):
+    # Escreve em uma pasta temporária e troca no final, para nunca deixar um artefato pela metade
+    pasta = os.path.abspath(pasta)
+    temporaria = pasta + ".tmp"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+    return pasta, temporaria
+
+def _concluir(pasta, temporaria, manifesto):
+    with open(os.path.join(temporaria, ARQUIVO_MANIFESTO), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    antiga = pasta + ".antigo"
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(pasta):
+        os.rename(pasta, antiga)
+    os.rename(temporaria, pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+    return manifesto
+
+def _manifesto(n_perguntas, dimensao, precisao, indice, intents, metadados):
+    return {
+        "versao_formato": VERSAO_FORMATO,
+        "criado_em": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "n_perguntas": int(n_perguntas),
+        "dimensao": int(dimensao),
+        "dtype": "float32",
+        "precisao": precisao,
+        "normalizado": True,
+        "indice": indice,
+        "intents": intents,
+        **(metadados or {}),
+    }
+
+def salvar_artefato(pasta, modelo_st, embeddings, perguntas, respostas, indice=None, metadados=None,
+                    cache_embeddings=None, precisao="float32", intents=None):
+    embeddings = _normalizar(embeddings)
+    pasta, temporaria = _criar_temporaria(pasta)
+
+    if modelo_st is not None:
+        modelo_st.save(os.path.join(temporaria, "transformer"))
+    np.save(os.path.join(temporaria, "embeddings.npy"), embeddings)
+    if precisao != "float32":
+        valores, escalas = quantizar(embeddings, precisao)
+        np.save(os.path.join(temporaria, f"embeddings_{precisao}.npy"), valores)
+        if escalas is not None:
+            np.save(os.path.join(temporaria, "embeddings_escala.npy"), escalas)
+    n_perguntas = salvar_tabela_strings(os.path.join(temporaria, "perguntas"), perguntas)
+    n_respostas = salvar_tabela_strings(os.path.join(temporaria, "respostas"), respostas)
+    if not n_perguntas == n_respostas == len(embeddings):
+        raise ValueError("Perguntas, respostas e embeddings com tamanhos diferentes")
+
+    nomes_intents = None
+    if intents is not None:
+        resposta_ids, _ = codificar_rotulos(respostas)
+        intent_ids, nomes_intents = codificar_rotulos(intents)
+        if len(intent_ids) != len(embeddings):
+            raise ValueError("Intents e embeddings com tamanhos diferentes")
+        np.save(os.path.join(temporaria, "resposta_ids.npy"), resposta_ids)
+        np.save(os.path.join(temporaria, "intent_ids.npy"), intent_ids)
+
+    if indice is not None:
+        _salvar_indice(temporaria, indice.para_dict())
+
+    if cache_embeddings is not None:
+        hashes, embeddings_textos = cache_embeddings
+        np.save(os.path.join(temporaria, "textos_hash.npy"), np.asarray(hashes, dtype=np.uint64))
+        np.save(os.path.join(temporaria, "textos_embeddings.npy"), _normalizar(embeddings_textos))
+
+    manifesto = _manifesto(len(embeddings), embeddings.shape[1] if embeddings.ndim == 2 else 0, precisao,
+                           indice.tipo if indice is not None else None, nomes_intents, metadados)
+    return _concluir(pasta, temporaria, manifesto)
+
+class EscritorArtefato:
+    # Mesmo artefato do salvar_artefato, mas recebido aos blocos (build em streaming):
+    # cada bloco de embeddings, strings e rótulos vai direto para os arquivos da pasta
+    # temporária, e a memória usada não depende do total de linhas. O índice é montado
+    # no final sobre o embeddings.npy aberto em mmap.
+
+    def __init__(self, pasta, modelo_st, dimensao, precisao="float32"):
+        self.pasta, self.temporaria = _criar_temporaria(pasta)
+        self.dimensao = dimensao
+        self.precisao = precisao
+        if modelo_st is not None:
+            modelo_st.save(self._caminho("transformer"))
+        self._embeddings = ArrayIncremental(self._caminho("embeddings.npy"), np.float32, dimensao)
+        self._quantizados = self._escalas = None
+        if precisao != "float32":
+            dtype = np.int8 if precisao == "int8" else np.float16
+            self._quantizados = ArrayIncremental(self._caminho(f"embeddings_{precisao}.npy"), dtype, dimensao)
+            if precisao == "int8":
+                self._escalas = ArrayIncremental(self._caminho("embeddings_escala.npy"), np.float32)
+        self._perguntas = TabelaStringsIncremental(self._caminho("perguntas"))
+        self._respostas = TabelaStringsIncremental(self._caminho("respostas"))
+        self._resposta_ids = ArrayIncremental(self._caminho("resposta_ids.npy"), np.int32)
+        self._intent_ids = ArrayIncremental(self._caminho("intent_ids.npy"), np.int32)
+        self._hashes = ArrayIncremental(self._caminho("textos_hash.npy"), np.uint64)
+        self._vocab_respostas = {}
+        self._vocab_intents = {}
+
+    def _caminho(self, nome):
+        return os.path.join(self.temporaria, nome)
+
+    @property
+    def linhas(self):
+        return self._embeddings.linhas
+
+    def embeddings_das_linhas(self, linhas):
+        # Embeddings (já normalizados) de linhas adicionadas em blocos anteriores
+        return self._embeddings.ler(linhas)
+
+    def adicionar(self, embeddings, perguntas, respostas, intents, hashes):
+        # hashes: hash_texto de cada pergunta, alinhado com as linhas (cache dos builds incrementais)
+        embeddings = _normalizar(embeddings)
+        respostas = list(respostas)
+        if not len(embeddings) == len(perguntas) == len(respostas) == len(intents) == len(hashes):
+            raise ValueError("Bloco com perguntas, respostas, intents e embeddings de tamanhos diferentes")
+        self._embeddings.adicionar(embeddings)
+        if self._quantizados is not None:
+            valores, escalas = quantizar(embeddings, self.precisao)
+            self._quantizados.adicionar(valores)
+            if self._escalas is not None:
+                self._escalas.adicionar(escalas)
+        self._perguntas.adicionar(perguntas)
+        self._respostas.adicionar(respostas)
+        self._resposta_ids.adicionar(codificar_rotulos(respostas, self._vocab_respostas)[0])
+        self._intent_ids.adicionar(codificar_rotulos(intents, self._vocab_intents)[0])
+        self._hashes.adicionar(hashes)
+
+    def concluir(self, backend=None, metadados=None):
+        for arquivo in (self._embeddings, self._quantizados, self._escalas, self._perguntas, self._respostas,
+                        self._resposta_ids, self._intent_ids, self._hashes):
+            if arquivo is not None:
+                arquivo.fechar()
+
+        if backend is not None:
+            embeddings = np.load(self._caminho("embeddings.npy"), mmap_mode="r")
+            resposta_ids = np.load(self._caminho("resposta_ids.npy"), mmap_mode="r")
+            _salvar_indice(self.temporaria, construir_indice(backend, embeddings, resposta_ids).para_dict())
+            # Solta os mapeamentos antes de a pasta ser renomeada
+            embeddings = resposta_ids = None
+
+        manifesto = _manifesto(self.linhas, self.dimensao, self.precisao, backend,
+                               list(self._vocab_intents), metadados)
+        return _concluir(self.pasta, self.temporaria, manifesto)
+
+def _salvar_indice(pasta, dados_indice):
+    escalares = {}
+    for nome, valor in dados_indice.items():
+        if isinstance(valor, np.ndarray):
+            np.save(os.path.join(pasta, f"indice_{nome}.npy"), valor)
+        else:
+            escalares[nome] = valor
+    with open(os.path.join(pasta, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump(escalares, f, ensure_ascii=False, indent=2)
+
+def ler_manifesto(pasta):
+    with open(os.path.join(pasta, ARQUIVO_MANIFESTO), "r", encoding="utf-8") as f:
+        manifesto = json.load(f)
+    if manifesto.get("versao_formato", 0) > VERSAO_FORMATO:
+        raise ValueError(
+            f"Artefato na versão {manifesto['versao_formato']}, mas este código lê até a versão {VERSAO_FORMATO}"
+        )
+    return manifesto
+
+def versao_artefato(pasta):
+    # Identifica uma build específica: muda sempre que o artefato é regravado
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    info = os.stat(caminho)
+    return f"{info.st_mtime_ns}-{info.st_size}"
+
+class Artefato:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.manifesto = ler_manifesto(pasta)
+        self.versao = versao_artefato(pasta)
+        self.embeddings = np.load(os.path.join(pasta, "embeddings.npy"), mmap_mode="r")
+        self.perguntas = TabelaStrings(os.path.join(pasta, "perguntas"))
+        self.respostas = TabelaStrings(os.path.join(pasta, "respostas"))
+
+    @property
+    def dados_indice(self):
+        caminho = os.path.join(self.pasta, "indice.json")
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        for arquivo in os.listdir(self.pasta):
+            if arquivo.startswith("indice_") and arquivo.endswith(".npy"):
+                nome = arquivo[len("indice_"):-len(".npy")]
+                dados[nome] = np.load(os.path.join(self.pasta, arquivo), mmap_mode="r")
+        return dados
+
+    def matriz_busca(self, rerank_k=10):
+        # Matriz usada na pontuação: a forma compacta, se o artefato tiver uma
+        precisao = self.manifesto.get("precisao", "float32")
+        if precisao == "float32":
+            return self.embeddings
+        valores = np.load(os.path.join(self.pasta, f"embeddings_{precisao}.npy"), mmap_mode="r")
+        caminho_escala = os.path.join(self.pasta, "embeddings_escala.npy")
+        escalas = np.load(caminho_escala) if os.path.exists(caminho_escala) else None
+        return MatrizQuantizada(valores, escalas, self.embeddings, rerank_k)
+
+    def rotulos(self):
+        # (resposta_ids, intent_ids, nomes das intents), ou None em artefatos sem intents
+        nomes = self.manifesto.get("intents")
+        if not nomes:
+            return None
+        return (np.load(os.path.join(self.pasta, "resposta_ids.npy")),
+                np.load(os.path.join(self.pasta, "intent_ids.npy")), nomes)
+
+    def cache_embeddings(self, mmap_mode=None):
+        # Por padrão lido para a memória (e não em mmap) porque o artefato vai ser substituído
+        # em seguida; a build em streaming usa mmap e solta o cache antes da troca
+        caminho_hash = os.path.join(self.pasta, "textos_hash.npy")
+        if not os.path.exists(caminho_hash):
+            return None
+        caminho_embeddings = os.path.join(self.pasta, "textos_embeddings.npy")
+        if not os.path.exists(caminho_embeddings):
+            caminho_embeddings = os.path.join(self.pasta, "embeddings.npy")
+        return np.load(caminho_hash), np.load(caminho_embeddings, mmap_mode=mmap_mode)
+
+    def carregar_modelo(self):
+        # Import tardio: torch só é carregado quando o transformer é realmente necessário
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(os.path.join(self.pasta, "transformer"))
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+# ==========================================================
+# Cache LRU de respostas, chaveado pelo texto pré-processado
+# ==========================================================
+# Cada entrada guarda (embedding, resposta, confianca). O cache fica preso à
+# versão do artefato que produziu as respostas: ao trocar de versão ele é esvaziado.
+
+class CacheRespostas:
+    def __init__(self, capacidade=2048, versao_artefato=None):
+        self.capacidade = capacidade
+        self.versao_artefato = versao_artefato
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.invalidacoes = 0
+
+    def obter(self, chave):
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave, embedding, resposta, confianca):
+        if self.capacidade <= 0:
+            return
+        with self._trava:
+            self._entradas[chave] = (embedding, resposta, confianca)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
+                self.despejos += 1
+
+    def vincular_versao(self, versao_artefato):
+        with self._trava:
+            if versao_artefato != self.versao_artefato:
+                if self._entradas:
+                    self.invalidacoes += 1
+                self._entradas.clear()
+                self.versao_artefato = versao_artefato
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def estatisticas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            'tamanho': len(self._entradas),
+            'capacidade': self.capacidade,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'despejos': self.despejos,
+            'invalidacoes': self.invalidacoes,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+        }
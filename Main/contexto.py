@@ -0,0 +1,154 @@
+import os
+import re
+import csv
+from collections import deque
+from functools import lru_cache
+import numpy as np
+from normalizacao import preprocessar_texto
+
+# ==========================================================
+# Extração de contexto por vocabulário
+# ==========================================================
+# O vocabulário (Dados/vocabulario_contexto.csv, separado por ';') liga formas de
+# superfície a um slot e a um valor canônico: slot;forma;valor. Dentro de um slot,
+# vale a forma que aparece primeiro no arquivo. O slot 'referencia' marca pronomes
+# que retomam o assunto anterior ("ele", "isso mesmo").
+#
+# Todas as formas viram uma única regex de alternância, compilada uma vez, que roda
+# sobre o texto já normalizado (sem acento, pontuação nem maiúsculas): "calcario" e
+# "calcário" casam igual, e só palavras inteiras casam ("alta" não casa em "faltando").
+
+CAMINHO_VOCABULARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Dados',
+                                   'vocabulario_contexto.csv')
+SLOTS_CONTEXTO = ('tipo_solo', 'nivel_fertilidade', 'problema', 'acao_desejada')
+SLOT_REFERENCIA = 'referencia'
+
+def ler_vocabulario(caminho=CAMINHO_VOCABULARIO):
+    with open(caminho, 'r', encoding='utf-8', newline='') as f:
+        return [(linha['slot'], linha['forma'], linha['valor']) for linha in csv.DictReader(f, delimiter=';')]
+
+class CasadorPalavras:
+    def __init__(self, entradas):
+        # forma normalizada -> [(slot, prioridade, valor)]; uma forma pode servir a mais de um slot
+        self._por_forma = {}
+        for prioridade, (slot, forma, valor) in enumerate(entradas):
+            forma = preprocessar_texto(forma)
+            if forma:
+                self._por_forma.setdefault(forma, []).append((slot, prioridade, valor))
+        # Formas mais longas primeiro: "alta fertilidade" ganha de "alta" na mesma posição
+        formas = sorted(self._por_forma, key=lambda f: (-len(f), f))
+        self._regex = None
+        if formas:
+            self._regex = re.compile(r'(?<!\S)(?:' + '|'.join(map(re.escape, formas)) + r')(?!\S)')
+
+    def casar_normalizado(self, texto):
+        # texto já passado por preprocessar_texto -> {slot: valor}
+        melhores = {}
+        if self._regex is None:
+            return melhores
+        for casamento in self._regex.finditer(texto):
+            for slot, prioridade, valor in self._por_forma[casamento.group()]:
+                if slot not in melhores or prioridade < melhores[slot][0]:
+                    melhores[slot] = (prioridade, valor)
+        return {slot: valor for slot, (_, valor) in melhores.items()}
+
+    def casar(self, texto):
+        return self.casar_normalizado(preprocessar_texto(texto))
+
+@lru_cache(maxsize=None)
+def casador_padrao():
+    return CasadorPalavras(ler_vocabulario())
+
+@lru_cache(maxsize=256)
+def _analisar_normalizado(texto):
+    # A mesma mensagem é analisada pelo estado da conversa e pela expansão: casa uma vez só
+    return tuple(casador_padrao().casar_normalizado(texto).items())
+
+# As versões *_normalizado recebem o texto já passado por preprocessar_texto, como o
+# atendimento já tem em mãos para a busca: só a regex roda. As demais normalizam antes,
+# por conveniência (scripts, console), e custam uma normalização a mais por mensagem.
+
+def extrair_contexto_normalizado(texto):
+    contexto = dict.fromkeys(SLOTS_CONTEXTO)
+    contexto.update((slot, valor) for slot, valor in _analisar_normalizado(texto) if slot in contexto)
+    return contexto
+
+def tem_referencia_normalizado(texto):
+    return any(slot == SLOT_REFERENCIA for slot, _ in _analisar_normalizado(texto))
+
+def extrair_contexto(entrada):
+    return extrair_contexto_normalizado(preprocessar_texto(entrada))
+
+def tem_referencia(entrada):
+    return tem_referencia_normalizado(preprocessar_texto(entrada))
+
+def atualizar_contexto(contexto_atual, nova_entrada):
+    contexto_final = contexto_atual.copy() if contexto_atual else {}
+    contexto_final.update((k, v) for k, v in extrair_contexto(nova_entrada).items() if v)
+    return contexto_final
+
+def prefixo_contexto(contexto):
+    # Texto que situa uma pergunta de retomada no assunto anterior ('' sem slot útil)
+    if contexto.get('tipo_solo'):
+        return f"meu solo {contexto['tipo_solo']}"
+    if contexto.get('nivel_fertilidade'):
+        return f"meu solo com {contexto['nivel_fertilidade']}"
+    if contexto.get('problema'):
+        return f"meu solo {contexto['problema']}"
+    return ''
+
+def expandir_pergunta_com_contexto(entrada, contexto_anterior):
+    if not contexto_anterior or not tem_referencia(entrada):
+        return entrada
+    prefixo = prefixo_contexto(contexto_anterior)
+    return f"{prefixo} {entrada}" if prefixo else entrada
+
+# ==========================================================
+# Estado de uma conversa, compartilhado pela GUI e pelo console
+# ==========================================================
+# Guarda os slots acumulados e os embeddings das últimas perguntas. Uma pergunta que
+# retoma o assunto ("e como corrijo isso?") é buscada com o próprio embedding somado
+# aos anteriores, com peso caindo pela metade a cada turno, em vez de montar um texto
+# prefixado e passar de novo pelo transformer. Os embeddings ficam só em memória:
+# uma sessão retomada do diário volta com os slots e cai na expansão por texto até
+# acumular embeddings de novo.
+
+N_EMBEDDINGS_CONTEXTO = 3
+PESO_CONTEXTO = 0.5
+
+def _unitario(embedding):
+    embedding = np.asarray(embedding, dtype=np.float32).ravel()
+    norma = np.linalg.norm(embedding)
+    return embedding / norma if norma > 0 else embedding
+
+class EstadoConversa:
+    def __init__(self, contexto=None, n_embeddings=N_EMBEDDINGS_CONTEXTO, peso=PESO_CONTEXTO):
+        self.contexto = dict(contexto or {})
+        self.embeddings = deque(maxlen=n_embeddings)
+        self.peso = peso
+
+    def atualizar(self, entrada_proc):
+        # entrada_proc já normalizada; devolve se a mensagem retoma o assunto anterior
+        referencia = False
+        for slot, valor in _analisar_normalizado(entrada_proc):
+            if slot == SLOT_REFERENCIA:
+                referencia = True
+            elif slot in SLOTS_CONTEXTO:
+                self.contexto[slot] = valor
+        return referencia
+
+    def registrar(self, embedding):
+        self.embeddings.append(_unitario(embedding))
+
+    def combinar(self, embedding):
+        consulta = _unitario(embedding)
+        fator = 1.0
+        for anterior in reversed(self.embeddings):
+            fator *= self.peso
+            consulta = consulta + fator * anterior
+        return _unitario(consulta)
+
+    def retomar(self, contexto):
+        # Sessão carregada do diário: volta com os slots do último turno
+        self.contexto = dict(contexto or {})
+        self.embeddings.clear()
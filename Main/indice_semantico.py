@@ -0,0 +1,436 @@
+import time
+import numpy as np
+
+# ==========================================================
+# Utilitários de similaridade (NumPy puro)
+# ==========================================================
+
+def normalizar_linhas(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    # einsum soma os quadrados linha a linha sem materializar uma cópia N×d (como np.linalg.norm faz)
+    normas = np.sqrt(np.einsum('...i,...i->...', matriz, matriz))[..., None]
+    # Matrizes já normalizadas (ex.: embeddings.npy em mmap) são usadas sem cópia
+    if np.allclose(normas, 1.0, atol=1e-4):
+        return matriz
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+def preparar_embeddings(embeddings):
+    # Matrizes quantizadas já guardam linhas normalizadas e são usadas como estão
+    if isinstance(embeddings, MatrizQuantizada):
+        return embeddings
+    return normalizar_linhas(embeddings)
+
+def busca_exaustiva(embedding, embeddings_norm):
+    consulta = normalizar_linhas(embedding).ravel()
+    if isinstance(embeddings_norm, MatrizQuantizada):
+        similaridades = embeddings_norm.produto(consulta)
+        return embeddings_norm.escolher(np.arange(len(similaridades)), similaridades, consulta)
+    # Um único GEMV sobre a matriz já normalizada: a única alocação por consulta é o vetor de N similaridades
+    similaridades = embeddings_norm @ consulta
+    indice = int(similaridades.argmax())
+    return indice, float(similaridades[indice])
+
+def top_k(similaridades, k, candidatos=None):
+    # Os k maiores em ordem decrescente, via argpartition (O(N)) + ordenação só dos k.
+    # Empates ficam com o menor índice, como no argmax.
+    n = len(similaridades)
+    k = min(k, n)
+    if k < n:
+        posicoes = np.argpartition(similaridades, n - k)[n - k:]
+        # O argpartition escolhe um qualquer entre empatados no corte: traz todos eles
+        limiar = similaridades[posicoes].min()
+        if np.count_nonzero(similaridades >= limiar) > k:
+            posicoes = np.flatnonzero(similaridades >= limiar)
+    else:
+        posicoes = np.arange(n)
+    escolhidos = posicoes if candidatos is None else candidatos[posicoes]
+    valores = similaridades[posicoes]
+    ordem = np.lexsort((escolhidos, -valores))[:k]
+    return escolhidos[ordem], valores[ordem]
+
+def top_k_lote(similaridades, k):
+    # Versão em lote de top_k: (consultas, N) -> (consultas, k), cada linha em ordem decrescente
+    n = similaridades.shape[1]
+    k = min(k, n)
+    if k < n:
+        posicoes = np.argpartition(similaridades, n - k, axis=1)[:, n - k:]
+        # Linhas com empate no corte (raras) refazem a escolha pelo top_k
+        limiares = np.take_along_axis(similaridades, posicoes, axis=1).min(axis=1, keepdims=True)
+        for linha in np.flatnonzero((similaridades >= limiares).sum(axis=1) > k):
+            posicoes[linha] = top_k(similaridades[linha], k)[0]
+    else:
+        posicoes = np.broadcast_to(np.arange(n), similaridades.shape)
+    valores = np.take_along_axis(similaridades, posicoes, axis=1)
+    ordem = np.lexsort((posicoes, -valores), axis=1)
+    return np.take_along_axis(posicoes, ordem, axis=1), np.take_along_axis(valores, ordem, axis=1)
+
+def _empilhar_top_k(resultados, k):
+    # Junta resultados de tamanhos diferentes; posições vazias ficam com índice -1 e similaridade -inf
+    indices = np.full((len(resultados), k), -1, dtype=np.int64)
+    similaridades = np.full((len(resultados), k), -np.inf, dtype=np.float32)
+    for linha, (i, s) in enumerate(resultados):
+        indices[linha, :len(i)] = i[:k]
+        similaridades[linha, :len(s)] = s[:k]
+    return indices, similaridades
+
+# ==========================================================
+# Embeddings quantizados (float16 / int8 com escala por linha)
+# ==========================================================
+
+PRECISOES = ('float32', 'float16', 'int8')
+
+def quantizar(embeddings_norm, precisao):
+    # Retorna (valores, escalas); escalas é None para float16
+    embeddings_norm = np.asarray(embeddings_norm, dtype=np.float32)
+    if precisao == 'float16':
+        return embeddings_norm.astype(np.float16), None
+    if precisao == 'int8':
+        escalas = np.abs(embeddings_norm).max(axis=1) / 127.0
+        escalas[escalas == 0] = 1.0
+        valores = np.clip(np.rint(embeddings_norm / escalas[:, None]), -127, 127).astype(np.int8)
+        return valores, escalas.astype(np.float32)
+    raise ValueError(f"Precisão desconhecida: {precisao} (opções: {', '.join(PRECISOES)})")
+
+class MatrizQuantizada:
+    # Pontua direto na forma compacta, convertendo blocos de linhas para float32 em um
+    # buffer reaproveitado (NumPy não tem GEMV em int8/float16 via BLAS). Opcionalmente
+    # reordena os top-k com a matriz float32 original, que fica em mmap e só tem essas
+    # linhas lidas do disco.
+
+    def __init__(self, valores, escalas=None, referencia=None, rerank_k=0, tamanho_bloco=4096):
+        self.valores = valores
+        self.escalas = escalas
+        self.referencia = referencia
+        self.rerank_k = rerank_k
+        self.tamanho_bloco = tamanho_bloco
+        self.shape = valores.shape
+        self._buffer = np.empty((min(tamanho_bloco, len(valores)), valores.shape[1]), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.valores)
+
+    @property
+    def nbytes(self):
+        return self.valores.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def __getitem__(self, indices):
+        linhas = np.asarray(self.valores[indices], dtype=np.float32)
+        if self.escalas is not None:
+            linhas *= self.escalas[indices][..., None]
+        return linhas
+
+    def produto(self, consulta):
+        similaridades = np.empty(len(self.valores), dtype=np.float32)
+        for inicio in range(0, len(self.valores), self.tamanho_bloco):
+            bloco = self.valores[inicio:inicio + self.tamanho_bloco]
+            buffer = self._buffer[:len(bloco)]
+            buffer[...] = bloco
+            np.matmul(buffer, consulta, out=similaridades[inicio:inicio + len(bloco)])
+        if self.escalas is not None:
+            similaridades *= self.escalas
+        return similaridades
+
+    def escolher(self, candidatos, similaridades, consulta):
+        if self.referencia is None or not self.rerank_k:
+            melhor = int(similaridades.argmax())
+            return int(candidatos[melhor]), float(similaridades[melhor])
+        indices, exatas = self.escolher_top_k(candidatos, similaridades, consulta, 1)
+        return int(indices[0]), float(exatas[0])
+
+    def escolher_top_k(self, candidatos, similaridades, consulta, k):
+        if self.referencia is None or not self.rerank_k:
+            return top_k(similaridades, k, candidatos)
+        topo, _ = top_k(similaridades, max(k, self.rerank_k), candidatos)
+        topo = np.sort(topo)
+        return top_k(self.referencia[topo] @ consulta, k, topo)
+
+# ==========================================================
+# Correspondência exata (atalho antes do embedding)
+# ==========================================================
+
+def construir_indice_exato(perguntas):
+    # pergunta normalizada -> índice da primeira ocorrência
+    # (a mesma linha que o argmax exaustivo escolheria entre embeddings idênticos)
+    indice_exato = {}
+    for i, pergunta in enumerate(perguntas):
+        indice_exato.setdefault(pergunta, i)
+    return indice_exato
+
+def cobertura_correspondencia_exata(entradas_normalizadas, indice_exato):
+    total = 0
+    atendidas = 0
+    for entrada in entradas_normalizadas:
+        total += 1
+        atendidas += entrada in indice_exato
+    return atendidas, total
+
+# ==========================================================
+# Deduplicação do banco de perguntas
+# ==========================================================
+
+def deduplicar_perguntas(perguntas, respostas, embeddings, limiar=0.97):
+    # Retorna os índices das linhas mantidas, na ordem original.
+    # 1) duplicatas exatas de (pergunta, resposta) ficam só com a primeira ocorrência
+    # 2) dentro de uma mesma resposta, paráfrases com cosseno >= limiar são colapsadas
+    vistos = set()
+    unicos = []
+    for i, par in enumerate(zip(perguntas, respostas)):
+        if par not in vistos:
+            vistos.add(par)
+            unicos.append(i)
+
+    embeddings_norm = normalizar_linhas(embeddings)
+    por_resposta = {}
+    for i in unicos:
+        por_resposta.setdefault(respostas[i], []).append(i)
+
+    mantidos = []
+    for indices in por_resposta.values():
+        aceitos = []
+        for i in indices:
+            if aceitos and float((embeddings_norm[aceitos] @ embeddings_norm[i]).max()) >= limiar:
+                continue
+            aceitos.append(i)
+        mantidos.extend(aceitos)
+
+    return sorted(mantidos)
+
+# ==========================================================
+# Backends de recuperação
+# ==========================================================
+# Todos expõem a mesma interface:
+#   construir(embeddings, respostas, **opcoes) -> indice
+#   buscar(embedding) -> (indice_da_pergunta, confianca)
+#   buscar_lote(embeddings) -> [(indice_da_pergunta, confianca), ...]
+#   buscar_top_k(embedding, k) -> (indices, confiancas) em ordem decrescente
+#   buscar_top_k_lote(embeddings, k) -> matrizes (consultas, k) com os mesmos dados
+#   para_dict() / de_dict(dados, embeddings) para persistir junto do modelo
+
+class BuscaExaustiva:
+    tipo = 'exaustiva'
+
+    def __init__(self, embeddings_norm):
+        self.embeddings_norm = embeddings_norm
+
+    @classmethod
+    def construir(cls, embeddings, respostas=None):
+        return cls(normalizar_linhas(embeddings))
+
+    def buscar(self, embedding):
+        return busca_exaustiva(embedding, self.embeddings_norm)
+
+    def buscar_top_k(self, embedding, k=10):
+        consulta = normalizar_linhas(embedding).ravel()
+        if isinstance(self.embeddings_norm, MatrizQuantizada):
+            similaridades = self.embeddings_norm.produto(consulta)
+            return self.embeddings_norm.escolher_top_k(np.arange(len(similaridades)), similaridades, consulta, k)
+        return top_k(self.embeddings_norm @ consulta, k)
+
+    def buscar_top_k_lote(self, embeddings, k=10):
+        if isinstance(self.embeddings_norm, MatrizQuantizada):
+            return _empilhar_top_k([self.buscar_top_k(e, k) for e in np.atleast_2d(embeddings)], k)
+        return top_k_lote(normalizar_linhas(np.atleast_2d(embeddings)) @ self.embeddings_norm.T, k)
+
+    def buscar_lote(self, embeddings):
+        if isinstance(self.embeddings_norm, MatrizQuantizada):
+            return [self.buscar(e) for e in np.atleast_2d(embeddings)]
+        similaridades = normalizar_linhas(np.atleast_2d(embeddings)) @ self.embeddings_norm.T
+        indices = similaridades.argmax(axis=1)
+        confiancas = similaridades[np.arange(len(indices)), indices]
+        return [(int(i), float(c)) for i, c in zip(indices, confiancas)]
+
+    def para_dict(self):
+        return {'tipo': self.tipo}
+
+    @classmethod
+    def de_dict(cls, dados, embeddings):
+        return cls(preparar_embeddings(embeddings))
+
+class _IndiceAgrupado:
+    # Listas invertidas: cada pergunta pertence a um grupo com um centróide.
+    # A consulta pontua os centróides e reordena só os membros dos grupos mais próximos.
+    tipo = None
+
+    def __init__(self, embeddings_norm, centroides, ordem_membros, inicio_grupos, n_grupos=5):
+        self.embeddings_norm = embeddings_norm
+        self.centroides = centroides
+        self.ordem_membros = ordem_membros
+        self.inicio_grupos = inicio_grupos
+        self.n_grupos = n_grupos
+
+    @classmethod
+    def _de_atribuicao(cls, embeddings_norm, grupo_de_linha, n_total_grupos, n_grupos):
+        ordem_membros = np.argsort(grupo_de_linha, kind='stable')
+        contagens = np.bincount(grupo_de_linha, minlength=n_total_grupos)
+        inicio_grupos = np.concatenate([[0], np.cumsum(contagens)]).astype(np.int64)
+
+        somas = np.zeros((n_total_grupos, embeddings_norm.shape[1]), dtype=np.float32)
+        np.add.at(somas, grupo_de_linha, embeddings_norm)
+        centroides = normalizar_linhas(somas)
+
+        return cls(embeddings_norm, centroides, ordem_membros, inicio_grupos, n_grupos)
+
+    def buscar(self, embedding, n_grupos=None):
+        consulta = normalizar_linhas(embedding).ravel()
+        return self._reordenar(consulta, self.centroides @ consulta, n_grupos)
+
+    def buscar_lote(self, embeddings, n_grupos=None):
+        consultas = normalizar_linhas(np.atleast_2d(embeddings))
+        sim_centroides = consultas @ self.centroides.T
+        return [self._reordenar(c, s, n_grupos) for c, s in zip(consultas, sim_centroides)]
+
+    def buscar_top_k(self, embedding, k=10, n_grupos=None):
+        consulta = normalizar_linhas(embedding).ravel()
+        candidatos = self._candidatos(self.centroides @ consulta, n_grupos)
+        similaridades = self.embeddings_norm[candidatos] @ consulta
+        if isinstance(self.embeddings_norm, MatrizQuantizada):
+            return self.embeddings_norm.escolher_top_k(candidatos, similaridades, consulta, k)
+        return top_k(similaridades, k, candidatos)
+
+    def buscar_top_k_lote(self, embeddings, k=10, n_grupos=None):
+        return _empilhar_top_k([self.buscar_top_k(e, k, n_grupos) for e in np.atleast_2d(embeddings)], k)
+
+    def _candidatos(self, sim_centroides, n_grupos=None):
+        n_grupos = min(n_grupos or self.n_grupos, len(self.centroides))
+        melhores = np.argpartition(-sim_centroides, n_grupos - 1)[:n_grupos]
+
+        candidatos = np.concatenate([
+            self.ordem_membros[self.inicio_grupos[g]:self.inicio_grupos[g + 1]] for g in melhores
+        ])
+        # Mantém a ordem original para desempatar igual ao argmax exaustivo
+        candidatos.sort()
+        return candidatos
+
+    def _reordenar(self, consulta, sim_centroides, n_grupos=None):
+        candidatos = self._candidatos(sim_centroides, n_grupos)
+        similaridades = self.embeddings_norm[candidatos] @ consulta
+        if isinstance(self.embeddings_norm, MatrizQuantizada):
+            return self.embeddings_norm.escolher(candidatos, similaridades, consulta)
+        melhor = int(similaridades.argmax())
+        return int(candidatos[melhor]), float(similaridades[melhor])
+
+    def para_dict(self):
+        return {
+            'tipo': self.tipo,
+            'centroides': self.centroides,
+            'ordem_membros': self.ordem_membros,
+            'inicio_grupos': self.inicio_grupos,
+            'n_grupos': self.n_grupos,
+        }
+
+    @classmethod
+    def de_dict(cls, dados, embeddings):
+        return cls(preparar_embeddings(embeddings), dados['centroides'], dados['ordem_membros'],
+                   dados['inicio_grupos'], dados.get('n_grupos', 5))
+
+class IndiceCentroides(_IndiceAgrupado):
+    # Um grupo por resposta distinta (~1.6k centróides no dataset atual)
+    tipo = 'centroides'
+
+    @classmethod
+    def construir(cls, embeddings, respostas, n_grupos=5):
+        embeddings_norm = normalizar_linhas(embeddings)
+        ids_grupo = {}
+        grupo_de_linha = np.array([ids_grupo.setdefault(r, len(ids_grupo)) for r in respostas], dtype=np.int64)
+        return cls._de_atribuicao(embeddings_norm, grupo_de_linha, len(ids_grupo), n_grupos)
+
+class IndiceIVF(_IndiceAgrupado):
+    # Grupos por k-means esférico; o número de listas cresce com sqrt(N),
+    # então o custo por consulta fica sublinear no tamanho do banco.
+    tipo = 'ivf'
+
+    @classmethod
+    def construir(cls, embeddings, respostas=None, n_listas=None, n_grupos=8, iteracoes=10,
+                  amostra_treino=50000, semente=42):
+        embeddings_norm = normalizar_linhas(embeddings)
+        n = len(embeddings_norm)
+        n_listas = min(n_listas or max(1, int(4 * np.sqrt(n))), n)
+
+        rng = np.random.default_rng(semente)
+        amostra = embeddings_norm
+        if n > amostra_treino:
+            amostra = embeddings_norm[rng.choice(n, amostra_treino, replace=False)]
+
+        centroides = amostra[rng.choice(len(amostra), n_listas, replace=False)].copy()
+        for _ in range(iteracoes):
+            atribuicao = _atribuir_grupos(amostra, centroides)
+            somas = np.zeros_like(centroides)
+            np.add.at(somas, atribuicao, amostra)
+            vazios = np.bincount(atribuicao, minlength=n_listas) == 0
+            somas[vazios] = centroides[vazios]
+            centroides = normalizar_linhas(somas)
+
+        grupo_de_linha = _atribuir_grupos(embeddings_norm, centroides)
+        return cls._de_atribuicao(embeddings_norm, grupo_de_linha, n_listas, n_grupos)
+
+def _atribuir_grupos(embeddings_norm, centroides, tamanho_bloco=8192):
+    atribuicao = np.empty(len(embeddings_norm), dtype=np.int64)
+    for inicio in range(0, len(embeddings_norm), tamanho_bloco):
+        bloco = embeddings_norm[inicio:inicio + tamanho_bloco]
+        atribuicao[inicio:inicio + tamanho_bloco] = (bloco @ centroides.T).argmax(axis=1)
+    return atribuicao
+
+BACKENDS = {
+    BuscaExaustiva.tipo: BuscaExaustiva,
+    IndiceCentroides.tipo: IndiceCentroides,
+    IndiceIVF.tipo: IndiceIVF,
+}
+
+def construir_indice(backend, embeddings, respostas, **opcoes):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de recuperação desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[backend].construir(embeddings, respostas, **opcoes)
+
+def carregar_indice(dados, embeddings):
+    # Modelos antigos (sem índice salvo) caem na busca exaustiva
+    if not dados:
+        return BuscaExaustiva.de_dict({}, embeddings)
+    return BACKENDS[dados['tipo']].de_dict(dados, embeddings)
+
+# ==========================================================
+# Verificação de recall contra a busca exaustiva
+# ==========================================================
+
+def verificar_recall(embeddings_treino, respostas_treino, embeddings_teste, backend='centroides',
+                     limiar=0.65, **opcoes):
+    indice = construir_indice(backend, embeddings_treino, respostas_treino, **opcoes)
+
+    iguais = 0
+    for embedding in embeddings_teste:
+        i_exato, conf_exato = busca_exaustiva(embedding, indice.embeddings_norm)
+        i_aprox, conf_aprox = indice.buscar(embedding)
+        r_exato = respostas_treino[i_exato] if conf_exato >= limiar else None
+        r_aprox = respostas_treino[i_aprox] if conf_aprox >= limiar else None
+        iguais += r_exato == r_aprox
+
+    total = len(embeddings_teste)
+    return iguais / total if total else 1.0
+
+# ==========================================================
+# Avaliação da quantização contra o float32
+# ==========================================================
+
+def avaliar_quantizacao(embeddings_float32, respostas, consultas, precisao, rerank_k=10, limiar=0.65):
+    referencia = normalizar_linhas(embeddings_float32)
+    valores, escalas = quantizar(referencia, precisao)
+    consultas = normalizar_linhas(consultas)
+
+    resultado = {'precisao': precisao, 'rerank_k': rerank_k, 'consultas': len(consultas),
+                 'bytes_float32': int(referencia.nbytes)}
+    for nome, matriz in (('float32', referencia),
+                         ('compacta', MatrizQuantizada(valores, escalas)),
+                         ('compacta_rerank', MatrizQuantizada(valores, escalas, referencia, rerank_k))):
+        inicio = time.perf_counter()
+        escolhas = [busca_exaustiva(c, matriz) for c in consultas]
+        resultado[f'latencia_ms_{nome}'] = 1000 * (time.perf_counter() - inicio) / max(len(consultas), 1)
+        resultado[f'_respostas_{nome}'] = [respostas[i] if conf >= limiar else None for i, conf in escolhas]
+
+    resultado['bytes_compacta'] = int(MatrizQuantizada(valores, escalas).nbytes)
+    resultado['memoria_economizada'] = 1 - resultado['bytes_compacta'] / resultado['bytes_float32']
+    base = resultado.pop('_respostas_float32')
+    for nome in ('compacta', 'compacta_rerank'):
+        respostas_nome = resultado.pop(f'_respostas_{nome}')
+        iguais = sum(a == b for a, b in zip(base, respostas_nome))
+        resultado[f'concordancia_{nome}'] = iguais / len(base) if base else 1.0
+    return resultado
@@ -0,0 +1,172 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+# ==========================================================
+# Rede de fertilidade em NumPy puro (sem TensorFlow)
+# ==========================================================
+# A rede do TreinoCalculos é pequena (Dense 32 -> 16 -> 64 -> BatchNorm -> softmax), e
+# na inferência ela é só uma sequência de produtos de matriz:
+#   - Dropout não faz nada fora do treino e é descartado
+#   - BatchNormalization com as médias móveis é afim por feature, h * a + c, com
+#     a = gamma / sqrt(var + eps) e c = beta - media * a. Como vem depois de uma ReLU,
+#     é dobrada na Dense seguinte: W' = a[:, None] * W e b' = c @ W + b
+# exportar_npz grava as camadas dobradas + os parâmetros do MinMaxScaler em um .npz
+# (abre com allow_pickle=False); RedeNumPy tem o mesmo predict do Keras e só importa NumPy.
+# `python modelo_numpy.py` exporta o modelo da pasta Modelos e confere contra o Keras.
+
+VERSAO_FORMATO = 1
+
+def _softmax(z):
+    z = np.exp(z - z.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+ATIVACOES = {
+    'linear': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0, out=z),
+    'sigmoid': lambda z: 1 / (1 + np.exp(-z)),
+    'tanh': np.tanh,
+    'softmax': _softmax,
+}
+
+class RedeNumPy:
+    def __init__(self, camadas):
+        # camadas: [(kernel (entrada × saída), bias, nome da ativação)]
+        self.camadas = []
+        for kernel, bias, ativacao in camadas:
+            if ativacao not in ATIVACOES:
+                raise ValueError(f"ativação não suportada: {ativacao}")
+            self.camadas.append((np.asarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), ativacao))
+
+    def __call__(self, x):
+        h = np.asarray(x, dtype=np.float32)
+        for kernel, bias, ativacao in self.camadas:
+            h = ATIVACOES[ativacao](h @ kernel + bias)
+        return h
+
+    def predict(self, x, batch_size=None, verbose=0):
+        return self(x)
+
+# ==========================================================
+# Exportação a partir do modelo Keras já carregado
+# ==========================================================
+
+def parametros_scaler(scaler):
+    # MinMaxScaler do sklearn -> o que a transformação usa: X * escala + deslocamento
+    return {
+        'features': [str(f) for f in getattr(scaler, 'feature_names_in_', [])],
+        'escala': np.asarray(scaler.scale_, dtype=np.float32),
+        'deslocamento': np.asarray(scaler.min_, dtype=np.float32),
+        'recorte': tuple(float(v) for v in scaler.feature_range) if getattr(scaler, 'clip', False) else None,
+    }
+
+def _afim_batchnorm(camada):
+    configuracao = camada.get_config()
+    pesos = iter(camada.get_weights())
+    gamma = next(pesos) if configuracao.get('scale', True) else None
+    beta = next(pesos) if configuracao.get('center', True) else None
+    media, variancia = next(pesos), next(pesos)
+    a = 1 / np.sqrt(variancia + configuracao.get('epsilon', 1e-3))
+    if gamma is not None:
+        a = gamma * a
+    c = -media * a if beta is None else beta - media * a
+    return a.astype(np.float64), c.astype(np.float64)
+
+def extrair_camadas(modelo):
+    # Sequential do Keras -> camadas densas com Dropout removido e BatchNorm dobrada
+    camadas = []
+    pendente = None  # afim (a, c) de uma BatchNorm esperando a próxima Dense
+    for camada in modelo.layers:
+        tipo = type(camada).__name__
+        if tipo in ('InputLayer', 'Dropout'):
+            continue
+        if tipo == 'BatchNormalization':
+            a, c = _afim_batchnorm(camada)
+            if pendente is None and camadas and camadas[-1][2] == 'linear':
+                # Logo depois de uma Dense sem ativação: dobra para trás
+                kernel, bias, ativacao = camadas[-1]
+                camadas[-1] = (kernel * a, bias * a + c, ativacao)
+            else:
+                pendente = (a, c) if pendente is None else (pendente[0] * a, pendente[1] * a + c)
+        elif tipo == 'Dense':
+            pesos = camada.get_weights()
+            kernel = pesos[0].astype(np.float64)
+            bias = pesos[1].astype(np.float64) if len(pesos) > 1 else np.zeros(kernel.shape[1])
+            if pendente is not None:
+                a, c = pendente
+                kernel, bias = a[:, None] * kernel, c @ kernel + bias
+                pendente = None
+            camadas.append((kernel, bias, camada.get_config().get('activation', 'linear')))
+        else:
+            raise ValueError(f"camada não suportada na exportação: {tipo}")
+    if pendente is not None:
+        # BatchNorm no fim da rede: vira uma camada afim diagonal
+        camadas.append((np.diag(pendente[0]), pendente[1], 'linear'))
+    # Dobrado em float64 e gravado em float32, como o Keras calcula
+    return [(k.astype(np.float32), b.astype(np.float32), a) for k, b, a in camadas]
+
+def exportar_npz(modelo, scaler, caminho):
+    camadas = extrair_camadas(modelo)
+    parametros = parametros_scaler(scaler)
+    arrays = {
+        'versao_formato': np.int32(VERSAO_FORMATO),
+        'ativacoes': np.array([a for _, _, a in camadas]),
+        'features': np.array(parametros['features'], dtype=str),
+        'escala': parametros['escala'],
+        'deslocamento': parametros['deslocamento'],
+        'recorte': np.array(parametros['recorte'] or (), dtype=np.float32),
+    }
+    for i, (kernel, bias, _) in enumerate(camadas):
+        arrays[f'kernel_{i}'] = kernel
+        arrays[f'bias_{i}'] = bias
+    np.savez_compressed(caminho, **arrays)
+    return RedeNumPy(camadas), parametros
+
+def carregar_npz(caminho):
+    # -> (RedeNumPy, parâmetros do scaler)
+    with np.load(caminho, allow_pickle=False) as dados:
+        if int(dados['versao_formato']) != VERSAO_FORMATO:
+            raise ValueError(f"formato do .npz não suportado: {int(dados['versao_formato'])}")
+        ativacoes = [str(a) for a in dados['ativacoes']]
+        camadas = [(dados[f'kernel_{i}'], dados[f'bias_{i}'], a) for i, a in enumerate(ativacoes)]
+        parametros = {
+            'features': [str(f) for f in dados['features']],
+            'escala': dados['escala'],
+            'deslocamento': dados['deslocamento'],
+            'recorte': tuple(float(v) for v in dados['recorte']) or None,
+        }
+    return RedeNumPy(camadas), parametros
+
+def diferenca_maxima(modelo, rede, n_features, n=10000, semente=42):
+    # Entradas já normalizadas, incluindo um pouco fora de [0, 1] (análises fora da faixa do treino)
+    x = np.random.default_rng(semente).uniform(-0.25, 1.25, size=(n, n_features)).astype(np.float32)
+    return float(np.abs(modelo.predict(x, batch_size=4096, verbose=0) - rede(x)).max())
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    pasta_modelos = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Modelos'))
+    parser = argparse.ArgumentParser(description="Exporta a rede de fertilidade para NumPy (.npz) e confere contra o Keras")
+    parser.add_argument("--modelo", default=os.path.join(pasta_modelos, 'modelo_fertilidade.keras'))
+    parser.add_argument("--scaler", default=os.path.join(pasta_modelos, 'scaler_fertilidade.save'))
+    parser.add_argument("--saida", default=os.path.join(pasta_modelos, 'modelo_fertilidade.npz'))
+    parser.add_argument("--tolerancia", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    import joblib
+    from tensorflow.keras.models import load_model
+    modelo = load_model(args.modelo)
+    scaler = joblib.load(args.scaler)
+
+    exportar_npz(modelo, scaler, args.saida)
+    rede, parametros = carregar_npz(args.saida)
+    print(f"💾 {len(rede.camadas)} camadas densas + scaler salvos em {args.saida} "
+          f"({os.path.getsize(args.saida) / 1024:.1f} KiB)")
+    diferenca = diferenca_maxima(modelo, rede, len(parametros['escala']))
+    if diferenca > args.tolerancia:
+        print(f"❌ NumPy difere do Keras em até {diferenca:.2e} (tolerância {args.tolerancia:.0e})")
+        sys.exit(1)
+    print(f"✅ NumPy reproduz o modelo.predict do Keras (diferença máx. {diferenca:.2e})")
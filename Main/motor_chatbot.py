@@ -0,0 +1,225 @@
+import time
+import numpy as np
+from indice_semantico import carregar_indice, construir_indice_exato
+from artefato import Artefato, versao_artefato
+from votacao import VotacaoTopK, carregar_votacao, respostas_rejeicao
+from cache_respostas import CacheRespostas
+from normalizacao import assinatura_normalizacao, preprocessar_texto, tabela_remocao
+from contexto import prefixo_contexto
+
+LIMIAR_CONFIANCA = 0.65
+INTERVALO_VERIFICACAO_ARTEFATO = 2.0
+RESPOSTA_NAO_ENTENDIDA = "Desculpe, não entendi sua pergunta. Pode reformular?"
+# Vizinhos buscados por alternativa pedida: paráfrases vizinhas costumam repetir a mesma resposta
+VIZINHOS_POR_ALTERNATIVA = 4
+
+# ==========================================================
+# Chatbot carregado do diretório do artefato (sem dependência de Qt)
+# ==========================================================
+
+class Chatbot:
+    def __init__(self, caminho_artefato: str, tamanho_cache: int = 2048, rerank_k: int = 10):
+        self.caminho_artefato = caminho_artefato
+        self.rerank_k = rerank_k
+        self.cache = CacheRespostas(tamanho_cache)
+        self._carregar_artefato()
+        # Tabela da normalização montada agora (junto com o carregamento), e não na primeira pergunta
+        tabela_remocao()
+
+    def _carregar_artefato(self):
+        print("📂 Carregando modelo e dados do artefato...")
+        artefato = Artefato(self.caminho_artefato)
+        self.modelo_st = artefato.carregar_modelo()
+        self.embeddings_perguntas = artefato.embeddings
+        self.perguntas = artefato.perguntas
+        self.respostas = artefato.respostas
+        # Com a votação top-k configurada na build, ela envolve o backend (mesma interface)
+        indice = carregar_indice(artefato.dados_indice, artefato.matriz_busca(self.rerank_k))
+        self.indice = carregar_votacao(artefato, indice)
+        self.respostas_rejeicao = respostas_rejeicao(self.respostas, artefato.rotulos())
+        self.indice_exato = construir_indice_exato(self.perguntas)
+        self.versao_artefato = artefato.versao
+        if artefato.manifesto.get('normalizacao', assinatura_normalizacao()) != assinatura_normalizacao():
+            # Outra versão do Unicode pode normalizar diferente do que foi usado na build
+            print("⚠️ Artefato normalizado com outra versão da normalização; reconstrua-o com o Treino")
+        self.cache.vincular_versao(artefato.versao)
+        self._proxima_verificacao = time.monotonic() + INTERVALO_VERIFICACAO_ARTEFATO
+
+    def verificar_artefato(self):
+        # Recarrega (e esvazia o cache) quando o artefato é regravado no disco
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return
+        self._proxima_verificacao = agora + INTERVALO_VERIFICACAO_ARTEFATO
+        try:
+            versao = versao_artefato(self.caminho_artefato)
+        except OSError:
+            return  # artefato sendo trocado neste instante; tenta na próxima
+        if versao != self.versao_artefato:
+            print("🔄 Artefato do modelo mudou, recarregando...")
+            self._carregar_artefato()
+
+    def _resposta_para(self, indice_mais_proximo: int, confianca: float) -> str:
+        if confianca < LIMIAR_CONFIANCA:
+            return RESPOSTA_NAO_ENTENDIDA
+        return self.respostas[indice_mais_proximo]
+
+    def rejeitada(self, resposta: str) -> bool:
+        # Abaixo do limiar ou vencida pela classe de rejeição 'nao_entendido'
+        return resposta == RESPOSTA_NAO_ENTENDIDA or resposta in self.respostas_rejeicao
+
+    def _embedding(self, entrada_proc: str):
+        # Embedding da pergunta sem passar pelo transformer quando já se conhece:
+        # a linha do banco (correspondência exata) ou o guardado no cache
+        indice_exato = self.indice_exato.get(entrada_proc)
+        if indice_exato is not None:
+            return self.embeddings_perguntas[indice_exato]
+        em_cache = self.cache.obter(entrada_proc)
+        if em_cache is not None:
+            return em_cache[0]
+        return self.modelo_st.encode(entrada_proc)
+
+    def _responder_normalizado(self, entrada_proc: str):
+        # -> (resposta, confianca, embedding da pergunta)
+        # Pergunta idêntica a uma do banco: reaproveita o embedding da linha (sem transformer
+        # e sem cache), mas passa pela mesma busca, votação e limiar que as demais
+        indice_exato = self.indice_exato.get(entrada_proc)
+        if indice_exato is not None:
+            embedding_usuario = self.embeddings_perguntas[indice_exato]
+        else:
+            em_cache = self.cache.obter(entrada_proc)
+            if em_cache is not None:
+                return em_cache[1], em_cache[2], em_cache[0]
+            embedding_usuario = self.modelo_st.encode(entrada_proc)
+        indice_mais_proximo, confianca = self.indice.buscar(embedding_usuario)
+        resposta = self._resposta_para(indice_mais_proximo, confianca)
+        if indice_exato is None:
+            self.cache.guardar(entrada_proc, embedding_usuario, resposta, confianca)
+        return resposta, confianca, embedding_usuario
+
+    def responder(self, entrada_usuario: str, estado=None):
+        # -> (resposta, confianca); com um EstadoConversa, a pergunta herda o contexto da sessão
+        self.verificar_artefato()
+        entrada_proc = preprocessar_texto(entrada_usuario)
+        if estado is None:
+            return self._responder_normalizado(entrada_proc)[:2]
+
+        referencia = estado.atualizar(entrada_proc)
+        if referencia and estado.embeddings:
+            # Continuação: combina o embedding da mensagem com os dos turnos anteriores.
+            # A resposta depende da conversa, então não vai para o cache
+            embedding_usuario = self._embedding(entrada_proc)
+            indice_mais_proximo, confianca = self.indice.buscar(estado.combinar(embedding_usuario))
+            estado.registrar(embedding_usuario)
+            return self._resposta_para(indice_mais_proximo, confianca), confianca
+
+        if referencia:
+            # Sessão retomada do diário, ainda sem embeddings: expande o texto com os slots
+            # (a normalização é por palavra: basta normalizar o prefixo e juntar)
+            prefixo = preprocessar_texto(prefixo_contexto(estado.contexto))
+            if prefixo:
+                entrada_proc = f"{prefixo} {entrada_proc}"
+        resposta, confianca, embedding_usuario = self._responder_normalizado(entrada_proc)
+        estado.registrar(embedding_usuario)
+        return resposta, confianca
+
+    def get_response(self, entrada_usuario: str, estado=None) -> str:
+        return self.responder(entrada_usuario, estado)[0]
+
+    def responder_lote(self, entradas, batch_size=64):
+        self.verificar_artefato()
+        entradas_proc = [preprocessar_texto(e) for e in entradas]
+        # Uma consulta ao cache por texto distinto; perguntas do banco nem passam por ele
+        por_texto = {}
+        pendentes = []
+        for entrada_proc in dict.fromkeys(entradas_proc):
+            if entrada_proc not in self.indice_exato:
+                em_cache = self.cache.obter(entrada_proc)
+                if em_cache is not None:
+                    por_texto[entrada_proc] = (em_cache[1], em_cache[2])
+                    continue
+            pendentes.append(entrada_proc)
+
+        if pendentes:
+            # Um único encode para os textos novos do lote (as perguntas do banco usam o
+            # embedding da linha) e uma única matriz de similaridades
+            embeddings_usuario = [None] * len(pendentes)
+            novos = []
+            for j, texto in enumerate(pendentes):
+                indice_exato = self.indice_exato.get(texto)
+                if indice_exato is not None:
+                    embeddings_usuario[j] = self.embeddings_perguntas[indice_exato]
+                else:
+                    novos.append(j)
+            if novos:
+                codificados = self.modelo_st.encode([pendentes[j] for j in novos], batch_size=batch_size)
+                for j, embedding in zip(novos, codificados):
+                    embeddings_usuario[j] = embedding
+            embeddings_usuario = np.stack(embeddings_usuario).astype(np.float32)
+            for texto, embedding, (indice, confianca) in zip(
+                pendentes, embeddings_usuario, self.indice.buscar_lote(embeddings_usuario)
+            ):
+                resposta = self._resposta_para(indice, confianca)
+                if texto not in self.indice_exato:
+                    self.cache.guardar(texto, embedding, resposta, confianca)
+                por_texto[texto] = (resposta, confianca)
+        return [por_texto[e] for e in entradas_proc]
+
+    def _alternativas(self, indices, similaridades, k):
+        # Respostas distintas entre os vizinhos, na ordem de similaridade (índice -1 = posição vazia)
+        alternativas = {}
+        for indice, similaridade in zip(indices, similaridades):
+            if indice < 0 or len(alternativas) == k:
+                break
+            alternativas.setdefault(self.respostas[int(indice)], float(similaridade))
+        return list(alternativas.items())
+
+    def responder_lote_top_k(self, entradas, k=3, batch_size=64):
+        # -> [(resposta, confianca, [(alternativa, similaridade), ...])] para o modo em lote.
+        # Perguntas do banco e do cache entram na busca com o embedding que já têm; só as
+        # novas passam pelo transformer, e o lote inteiro sai de uma única busca top-k
+        self.verificar_artefato()
+        entradas_proc = [preprocessar_texto(e) for e in entradas]
+        distintas = list(dict.fromkeys(entradas_proc))
+        if not distintas:
+            return []
+        embeddings = [None] * len(distintas)
+        conhecidas = {}
+        novas = []
+        for j, entrada_proc in enumerate(distintas):
+            indice_exato = self.indice_exato.get(entrada_proc)
+            if indice_exato is not None:
+                # Pergunta do banco: só o embedding vem da linha (sem cache), a resposta sai do voto
+                embeddings[j] = self.embeddings_perguntas[indice_exato]
+                continue
+            em_cache = self.cache.obter(entrada_proc)
+            if em_cache is not None:
+                embeddings[j] = em_cache[0]
+                conhecidas[j] = (em_cache[1], em_cache[2])
+            else:
+                novas.append(j)
+        if novas:
+            codificados = self.modelo_st.encode([distintas[j] for j in novas], batch_size=batch_size)
+            for j, embedding in zip(novas, codificados):
+                embeddings[j] = embedding
+
+        # Com votação, os mesmos vizinhos servem ao voto e às alternativas
+        k_busca = max(VIZINHOS_POR_ALTERNATIVA * k, self.indice.k if isinstance(self.indice, VotacaoTopK) else 1)
+        indices, similaridades = self.indice.buscar_top_k_lote(np.stack(embeddings).astype(np.float32), k_busca)
+        if isinstance(self.indice, VotacaoTopK):
+            voto = self.indice.votar_top_k(indices, similaridades)
+            melhores = zip(voto['linha'], voto['confianca'])
+        else:
+            melhores = zip(indices[:, 0], similaridades[:, 0])
+
+        por_texto = {}
+        for j, (entrada_proc, (linha, confianca)) in enumerate(zip(distintas, melhores)):
+            if j in conhecidas:
+                resposta, confianca = conhecidas[j]
+            else:
+                confianca = float(confianca)
+                resposta = self._resposta_para(int(linha), confianca)
+                if entrada_proc not in self.indice_exato:
+                    self.cache.guardar(entrada_proc, embeddings[j], resposta, confianca)
+            por_texto[entrada_proc] = (resposta, confianca, self._alternativas(indices[j], similaridades[j], k))
+        return [por_texto[e] for e in entradas_proc]
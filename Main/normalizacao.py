@@ -0,0 +1,81 @@
+import sys
+import string
+import unicodedata
+from functools import lru_cache
+import numpy as np
+
+# ==========================================================
+# Normalização de texto compartilhada por treino e atendimento
+# ==========================================================
+# minúsculas -> NFD -> remove marcas combinantes (Mn, os acentos) e pontuação ASCII
+# -> colapsa espaços, com uma única tabela de remoção montada uma vez por processo.
+# O texto normalizado na build (normalizar_serie) e o normalizado a cada pergunta
+# (preprocessar_texto) têm de ser os mesmos bytes: é isso que faz a correspondência
+# exata e o cache acertarem. Por isso o lote não reimplementa as regras com os
+# métodos .str do pandas (cada um é outro laço em Python sobre a coluna, e mais lento):
+# ele agrupa os textos repetidos com pd.factorize e passa só os distintos pela mesma
+# função do atendimento. `python normalizacao.py [csv]` confere a igualdade.
+
+VERSAO_NORMALIZACAO = 1
+
+@lru_cache(maxsize=None)
+def tabela_remocao():
+    # Montada na primeira chamada (varre o Unicode inteiro, ~0.2 s), e não no import
+    remover = dict.fromkeys(
+        c for c in range(sys.maxunicode + 1) if unicodedata.category(chr(c)) == "Mn"
+    )
+    remover.update(dict.fromkeys(map(ord, string.punctuation)))
+    return remover
+
+def assinatura_normalizacao():
+    # Gravada no manifesto do artefato: a tabela Mn depende da versão do Unicode do Python
+    return {"versao": VERSAO_NORMALIZACAO, "unicode": unicodedata.unidata_version}
+
+def preprocessar_texto(texto: str) -> str:
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFD", texto)
+    return " ".join(texto.translate(tabela_remocao()).split())
+
+def normalizar_serie(serie):
+    # Versão em lote para uma Series do pandas; valores ausentes viram o texto 'nan'
+    import pandas as pd
+    codigos, unicos = pd.factorize(serie.astype(str), use_na_sentinel=False)
+    normalizados = np.array([preprocessar_texto(str(t)) for t in unicos], dtype=object)
+    return pd.Series(normalizados[codigos], index=serie.index, name=serie.name)
+
+# ==========================================================
+# Conferência: lote == texto a texto, byte a byte
+# ==========================================================
+
+CASOS_BORDA = [
+    "", "   ", "Olá, TUDO bem?!", "Fertilidade   do\tsolo\né BAIXA...", "ÇÃO ção ÂÊÎÔÛ àèìòù",
+    "İstanbul", "ﬁ ligadura", "a b c　d", "x\x1cy\x1dz\x1e\x1f", "emoji 🌱🌽 ok",
+    "ñáo combinante solto", "«aspas» “curvas” — travessão", "NaN", "१२३ ٣٤٥",
+]
+
+def _referencia(texto):
+    # Definição direta, caractere a caractere: a especificação que as versões rápidas seguem
+    texto = "".join(c for c in unicodedata.normalize("NFD", texto.lower()) if unicodedata.category(c) != "Mn")
+    return " ".join(texto.translate(str.maketrans("", "", string.punctuation)).split())
+
+def verificar_consistencia(textos):
+    # Devolve as entradas em que lote, texto a texto e referência divergem (lista vazia = idênticos)
+    import pandas as pd
+    originais = [str(t) for t in textos]
+    serie = pd.Series(originais, dtype=object)
+    return [(t, a, b, c) for t, a, b, c in zip(originais, normalizar_serie(serie), map(preprocessar_texto, originais),
+                                              map(_referencia, originais))
+            if not a.encode("utf-8") == b.encode("utf-8") == c.encode("utf-8")]
+
+if __name__ == "__main__":
+    import pandas as pd
+    textos = list(CASOS_BORDA) + [chr(c) for c in range(0x20, 0x3000)]
+    if len(sys.argv) > 1:
+        textos += pd.read_csv(sys.argv[1], sep=";", encoding="utf-8")["input_text"].tolist()
+    divergencias = verificar_consistencia(textos)
+    for original, lote, unitario, referencia in divergencias[:20]:
+        print(f"❌ {original!r}: lote {lote!r} | texto a texto {unitario!r} | referência {referencia!r}")
+    if divergencias:
+        sys.exit(1)
+    print(f"✅ {len(textos)} textos normalizados de forma idêntica no lote, texto a texto e na referência")
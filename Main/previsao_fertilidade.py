@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from modelo_numpy import carregar_npz, parametros_scaler
+
+# ==========================================================
+# Previsão da fertilidade do solo em lote (modelo Keras + MinMaxScaler)
+# ==========================================================
+# O modelo e o scaler são carregados uma vez. As análises entram como array
+# (amostras × features), DataFrame (colunas pelo nome das features do scaler) ou CSV,
+# e passam em lotes de `tamanho_lote`:
+#   - o MinMaxScaler vira X * scale_ + min_ em NumPy, sem a validação do sklearn a cada chamada
+#   - o modelo roda em um tf.function com assinatura fixa (None × n_features, float32):
+#     um único trace, sem o custo fixo do modelo.predict a cada chamada
+# Com o .npz exportado por modelo_numpy.py, carregar_previsor_numpy faz o mesmo sem
+# TensorFlow (a rede roda em NumPy): é o caminho para usar dentro do processo do chatbot.
+# `python previsao_fertilidade.py analises.csv [--numpy]` grava as probabilidades de cada classe.
+
+PASTA_MODELOS = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Modelos'))
+CAMINHO_MODELO = os.path.join(PASTA_MODELOS, 'modelo_fertilidade.keras')
+CAMINHO_SCALER = os.path.join(PASTA_MODELOS, 'scaler_fertilidade.save')
+CAMINHO_NPZ = os.path.join(PASTA_MODELOS, 'modelo_fertilidade.npz')
+CLASSES_FERTILIDADE = ('Baixa Fertilidade', 'Média Fertilidade', 'Alta Fertilidade')
+COLUNAS_PROBABILIDADE = ('prob_baixa', 'prob_media', 'prob_alta')
+TAMANHO_LOTE = 4096
+
+class PrevisorFertilidade:
+    def __init__(self, modelo, scaler, tamanho_lote=TAMANHO_LOTE, compilar=True):
+        # modelo: Keras ou RedeNumPy (esta com compilar=False); scaler: MinMaxScaler ou
+        # os parâmetros dele já extraídos (dict de parametros_scaler / do .npz)
+        self.modelo = modelo
+        self.tamanho_lote = tamanho_lote
+        parametros = scaler if isinstance(scaler, dict) else parametros_scaler(scaler)
+        self.features = parametros['features']
+        # transform(X) = X * escala + deslocamento (e recorte, se o scaler tem clip=True)
+        self.escala = parametros['escala']
+        self.deslocamento = parametros['deslocamento']
+        self.recorte = parametros['recorte']
+        self.n_features = len(self.escala)
+        self._inferir = self._compilar() if compilar else None
+
+    def _compilar(self):
+        import tensorflow as tf
+        modelo = self.modelo
+        assinatura = [tf.TensorSpec(shape=(None, self.n_features), dtype=tf.float32)]
+        return tf.function(lambda x: modelo(x, training=False), input_signature=assinatura)
+
+    def matriz(self, amostras):
+        # DataFrame com as colunas do treino -> na ordem do scaler; o resto vira array float32
+        if hasattr(amostras, 'columns') and self.features and set(self.features) <= set(amostras.columns):
+            amostras = amostras[self.features]
+        matriz = np.atleast_2d(np.asarray(amostras, dtype=np.float32))
+        if matriz.ndim != 2 or matriz.shape[1] != self.n_features:
+            raise ValueError(f"esperadas {self.n_features} features por amostra, recebido formato {matriz.shape}")
+        return matriz
+
+    def normalizar(self, matriz):
+        normalizada = matriz * self.escala + self.deslocamento
+        if self.recorte is not None:
+            np.clip(normalizada, *self.recorte, out=normalizada)
+        return normalizada
+
+    def _prever_lote(self, normalizada):
+        if self._inferir is not None:
+            return self._inferir(normalizada).numpy()
+        return self.modelo.predict(normalizada, batch_size=len(normalizada), verbose=0)
+
+    def prever_proba(self, amostras):
+        matriz = self.matriz(amostras)
+        probabilidades = np.empty((len(matriz), len(CLASSES_FERTILIDADE)), dtype=np.float32)
+        for inicio in range(0, len(matriz), self.tamanho_lote):
+            fim = inicio + self.tamanho_lote
+            probabilidades[inicio:fim] = self._prever_lote(self.normalizar(matriz[inicio:fim]))
+        return probabilidades
+
+    def prever(self, amostras):
+        return self.prever_proba(amostras).argmax(axis=1)
+
+def carregar_previsor(caminho_modelo=CAMINHO_MODELO, caminho_scaler=CAMINHO_SCALER, tamanho_lote=TAMANHO_LOTE,
+                      compilar=True):
+    import joblib
+    from tensorflow.keras.models import load_model
+    return PrevisorFertilidade(load_model(caminho_modelo), joblib.load(caminho_scaler), tamanho_lote, compilar)
+
+def carregar_previsor_numpy(caminho_npz=CAMINHO_NPZ, tamanho_lote=TAMANHO_LOTE):
+    rede, parametros = carregar_npz(caminho_npz)
+    return PrevisorFertilidade(rede, parametros, tamanho_lote, compilar=False)
+
+def prever_csv(previsor, caminho_entrada, caminho_saida, sep=';', linhas_por_bloco=100000):
+    # O CSV é lido e gravado em blocos: a memória não cresce com o número de análises
+    import pandas as pd
+    total = 0
+    for i, bloco in enumerate(pd.read_csv(caminho_entrada, sep=sep, chunksize=linhas_por_bloco)):
+        probabilidades = previsor.prever_proba(bloco)
+        for coluna, valores in zip(COLUNAS_PROBABILIDADE, probabilidades.T):
+            bloco[coluna] = valores
+        bloco['classe_prevista'] = np.asarray(CLASSES_FERTILIDADE, dtype=object)[probabilidades.argmax(axis=1)]
+        bloco.to_csv(caminho_saida, sep=sep, index=False, mode='w' if i == 0 else 'a', header=i == 0,
+                     encoding='utf-8')
+        total += len(bloco)
+    return total
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Previsão em lote da fertilidade do solo a partir de um CSV de análises")
+    parser.add_argument("entrada", help="CSV com as colunas das features do treino")
+    parser.add_argument("--saida", default=None, help="CSV de saída (padrão: <entrada>_previsoes.csv)")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO)
+    parser.add_argument("--scaler", default=CAMINHO_SCALER)
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--sem-tf-function", action="store_true", help="usa modelo.predict por lote em vez do tf.function")
+    parser.add_argument("--numpy", action="store_true", help="usa o .npz exportado por modelo_numpy.py, sem TensorFlow")
+    parser.add_argument("--npz", default=CAMINHO_NPZ)
+    parser.add_argument("--sep", default=";")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        print(f"❌ Arquivo de análises não encontrado: {args.entrada}")
+        sys.exit(1)
+    caminho_saida = args.saida or f"{os.path.splitext(args.entrada)[0]}_previsoes.csv"
+
+    inicio = time.perf_counter()
+    if args.numpy:
+        if not os.path.exists(args.npz):
+            print(f"❌ {args.npz} não encontrado; gere-o com `python modelo_numpy.py`")
+            sys.exit(1)
+        previsor = carregar_previsor_numpy(args.npz, args.tamanho_lote)
+    else:
+        previsor = carregar_previsor(args.modelo, args.scaler, args.tamanho_lote, not args.sem_tf_function)
+    print(f"📂 Modelo e scaler carregados em {time.perf_counter() - inicio:.2f} s ({previsor.n_features} features)")
+
+    try:
+        inicio = time.perf_counter()
+        total = prever_csv(previsor, args.entrada, caminho_saida, args.sep)
+    except (KeyError, ValueError) as e:
+        print(f"❌ Entrada inválida: {e}")
+        sys.exit(1)
+    decorrido = time.perf_counter() - inicio
+    print(f"✅ {total} análises em {decorrido:.2f} s ({total / decorrido:.0f} amostras/s) -> {caminho_saida}")
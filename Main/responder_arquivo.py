@@ -0,0 +1,157 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from itertools import islice
+from artefato import CAMINHO_ARTEFATO
+from motor_chatbot import Chatbot
+
+# ==========================================================
+# Modo em lote: responde um arquivo inteiro de perguntas
+# ==========================================================
+# python responder_arquivo.py perguntas.csv [--saida respostas.csv] [--top-k 3]
+#
+# Entrada: CSV (separador ';', como os do projeto) ou JSONL (um objeto por linha, ou
+# só a string da pergunta). O arquivo é lido em lotes de `tamanho_lote` registros: cada
+# lote é codificado de uma vez e pontuado com uma única busca top-k, e as respostas são
+# gravadas antes de ler o próximo. A memória fica limitada ao lote, qualquer que seja
+# o tamanho do arquivo.
+#
+# Saída: os campos originais de cada registro + resposta_bot, confianca e as k
+# respostas alternativas mais próximas com a similaridade de cada uma. O formato segue
+# a extensão da saída (.jsonl ou .csv).
+
+COLUNAS_PERGUNTA = ('pergunta', 'input_text', 'mensagem', 'texto')
+
+def formato_arquivo(caminho):
+    return 'jsonl' if os.path.splitext(caminho)[1].lower() in ('.jsonl', '.json') else 'csv'
+
+def ler_registros(caminho, sep=';'):
+    # utf-8-sig: planilhas exportadas pelo Excel começam com BOM
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+        if formato_arquivo(caminho) == 'csv':
+            yield from csv.DictReader(f, delimiter=sep)
+            return
+        for linha in f:
+            if linha.strip():
+                registro = json.loads(linha)
+                yield registro if isinstance(registro, dict) else {'pergunta': str(registro)}
+
+def escolher_coluna(registro, coluna=None):
+    if coluna is not None:
+        if coluna not in registro:
+            raise KeyError(f"coluna '{coluna}' não existe na entrada (colunas: {', '.join(registro)})")
+        return coluna
+    for nome in COLUNAS_PERGUNTA:
+        if nome in registro:
+            return nome
+    return next(iter(registro))
+
+class SaidaRespostas:
+    def __init__(self, caminho, k, sep=';'):
+        self.formato = formato_arquivo(caminho)
+        self.k = k
+        self.sep = sep
+        self._arquivo = open(caminho, 'w', encoding='utf-8', newline='')
+        self._escritor = None
+
+    def escrever_lote(self, registros, resultados):
+        if self.formato == 'jsonl':
+            for registro, (resposta, confianca, alternativas) in zip(registros, resultados):
+                saida = dict(registro, resposta_bot=resposta, confianca=round(float(confianca), 4),
+                             alternativas=[{'resposta': r, 'similaridade': round(s, 4)} for r, s in alternativas])
+                self._arquivo.write(json.dumps(saida, ensure_ascii=False) + '\n')
+        else:
+            if self._escritor is None:
+                # Cabeçalho a partir do primeiro registro + uma coluna por alternativa
+                campos = list(registros[0]) + ['resposta_bot', 'confianca']
+                for i in range(1, self.k + 1):
+                    campos += [f'alternativa_{i}', f'similaridade_{i}']
+                self._escritor = csv.DictWriter(self._arquivo, campos, delimiter=self.sep, restval='',
+                                                extrasaction='ignore')
+                self._escritor.writeheader()
+            for registro, (resposta, confianca, alternativas) in zip(registros, resultados):
+                saida = dict(registro, resposta_bot=resposta, confianca=f'{confianca:.4f}')
+                for i, (alternativa, similaridade) in enumerate(alternativas, 1):
+                    saida[f'alternativa_{i}'] = alternativa
+                    saida[f'similaridade_{i}'] = f'{similaridade:.4f}'
+                self._escritor.writerow(saida)
+        # Cada lote fica no disco antes do próximo ser lido
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+def responder_arquivo(chatbot, caminho_entrada, caminho_saida, coluna=None, k=3, tamanho_lote=1024,
+                      batch_size=64, sep=';'):
+    registros = ler_registros(caminho_entrada, sep)
+    saida = SaidaRespostas(caminho_saida, k, sep)
+    total = 0
+    rejeitadas = 0
+    inicio = time.perf_counter()
+    try:
+        while True:
+            lote = list(islice(registros, tamanho_lote))
+            if not lote:
+                break
+            coluna = escolher_coluna(lote[0], coluna)
+            resultados = chatbot.responder_lote_top_k([str(r.get(coluna) or '') for r in lote], k, batch_size)
+            saida.escrever_lote(lote, resultados)
+            total += len(lote)
+            rejeitadas += sum(chatbot.rejeitada(r[0]) for r in resultados)
+            decorrido = time.perf_counter() - inicio
+            print(f"⏳ {total} perguntas respondidas ({total / decorrido:.0f} perguntas/s)")
+    finally:
+        saida.fechar()
+
+    decorrido = time.perf_counter() - inicio
+    return {
+        'perguntas': total,
+        'rejeitadas': rejeitadas,
+        'segundos': decorrido,
+        'perguntas_por_segundo': total / decorrido if decorrido > 0 else 0.0,
+        'cache': chatbot.cache.estatisticas(),
+    }
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Responde em lote um arquivo CSV ou JSONL de perguntas")
+    parser.add_argument("entrada", help="arquivo .csv (separador --sep) ou .jsonl com as perguntas")
+    parser.add_argument("--saida", default=None, help="arquivo de respostas (.csv ou .jsonl); padrão: <entrada>_respostas")
+    parser.add_argument("--artefato", default=CAMINHO_ARTEFATO, help="diretório do artefato do modelo")
+    parser.add_argument("--coluna", default=None, help=f"coluna da pergunta (padrão: a primeira entre {', '.join(COLUNAS_PERGUNTA)})")
+    parser.add_argument("--top-k", type=int, default=3, help="respostas alternativas por pergunta")
+    parser.add_argument("--tamanho-lote", type=int, default=1024, help="registros lidos, codificados e gravados por vez")
+    parser.add_argument("--batch-size", type=int, default=64, help="batch do encode do transformer")
+    parser.add_argument("--sep", default=";")
+    args = parser.parse_args()
+
+    base, extensao = os.path.splitext(args.entrada)
+    caminho_saida = args.saida or f"{base}_respostas{extensao or '.csv'}"
+    if not os.path.exists(args.entrada):
+        print(f"❌ Arquivo de perguntas não encontrado: {args.entrada}")
+        sys.exit(1)
+
+    try:
+        chatbot = Chatbot(args.artefato)
+    except FileNotFoundError as e:
+        print(f"❌ Artefato do modelo não encontrado: {e}")
+        sys.exit(1)
+
+    try:
+        estatisticas = responder_arquivo(chatbot, args.entrada, caminho_saida, args.coluna, args.top_k,
+                                         args.tamanho_lote, args.batch_size, args.sep)
+    except (KeyError, ValueError) as e:
+        print(f"❌ Entrada inválida: {e}")
+        sys.exit(1)
+
+    cache = estatisticas['cache']
+    print(f"✅ {estatisticas['perguntas']} perguntas em {estatisticas['segundos']:.2f} s "
+          f"({estatisticas['perguntas_por_segundo']:.0f} perguntas/s) -> {caminho_saida}")
+    print(f"🤷 {estatisticas['rejeitadas']} sem resposta confiável | ⚡ cache: {cache['acertos']} acertos, "
+          f"{cache['falhas']} falhas")
@@ -0,0 +1,213 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter
+from artefato import CAMINHO_ARTEFATO
+from motor_chatbot import Chatbot
+
+# ==========================================================
+# Servidor HTTP headless com micro-lotes de inferência
+# ==========================================================
+# POST /responder      {"mensagem": "..."} -> {"resposta": "...", "confianca": 0.87}
+# GET  /estatisticas   profundidade da fila e tamanhos de lote
+#
+# Requisições que chegam dentro de `janela_ms` são agrupadas em um único
+# modelo_st.encode + uma única matriz de similaridades, e os resultados
+# são devolvidos para cada cliente.
+
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+MAXIMO_CABECALHOS = 100
+
+class MicroLote:
+    def __init__(self, chatbot, janela_ms=10, lote_maximo=64):
+        self.chatbot = chatbot
+        self.janela = janela_ms / 1000
+        self.lote_maximo = lote_maximo
+        self.fila = asyncio.Queue()
+        self.requisicoes_total = 0
+        self.lotes_total = 0
+        self.maior_lote = 0
+        self.tamanhos_lote = Counter()
+        self.tempo_inferencia_total = 0.0
+
+    async def responder(self, mensagem):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((mensagem, futuro))
+        return await futuro
+
+    async def executar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.fila.get()]
+            limite = loop.time() + self.janela
+            while len(lote) < self.lote_maximo:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            mensagens = [m for m, _ in lote]
+            inicio = time.perf_counter()
+            try:
+                # O encode roda fora do event loop para não travar as conexões
+                resultados = await loop.run_in_executor(None, self.chatbot.responder_lote, mensagens)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            self.tempo_inferencia_total += time.perf_counter() - inicio
+
+            self.requisicoes_total += len(lote)
+            self.lotes_total += 1
+            self.maior_lote = max(self.maior_lote, len(lote))
+            self.tamanhos_lote[len(lote)] += 1
+            for (_, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+    def estatisticas(self):
+        return {
+            'fila': self.fila.qsize(),
+            'requisicoes_total': self.requisicoes_total,
+            'lotes_total': self.lotes_total,
+            'tamanho_medio_lote': self.requisicoes_total / self.lotes_total if self.lotes_total else 0.0,
+            'maior_lote': self.maior_lote,
+            'tamanhos_lote': {str(k): v for k, v in sorted(self.tamanhos_lote.items())},
+            'inferencia_media_ms': 1000 * self.tempo_inferencia_total / self.lotes_total if self.lotes_total else 0.0,
+            'janela_ms': self.janela * 1000,
+            'lote_maximo': self.lote_maximo,
+            'cache': self.chatbot.cache.estatisticas(),
+        }
+
+# ==========================================================
+# HTTP/1.1 mínimo sobre asyncio (somente stdlib)
+# ==========================================================
+
+STATUS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+async def enviar_json(writer, status, corpo, manter_conexao):
+    dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+    cabecalho = (
+        f"HTTP/1.1 {status} {STATUS_HTTP[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(dados)}\r\n"
+        f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n\r\n"
+    )
+    writer.write(cabecalho.encode("ascii") + dados)
+    await writer.drain()
+
+def tamanho_corpo(cabecalhos):
+    # Content-Length só com dígitos ASCII (sem sinal, espaços internos ou outros numerais Unicode)
+    valor = cabecalhos.get('content-length', '') or '0'
+    if not (valor.isascii() and valor.isdigit()):
+        return None
+    return int(valor)
+
+async def atender_conexao(reader, writer, micro_lote):
+    try:
+        while True:
+            linha = await reader.readline()
+            if not linha:
+                break
+            try:
+                metodo, caminho, versao = linha.decode("latin-1").split()
+            except ValueError:
+                await enviar_json(writer, 400, {'erro': 'linha de requisição inválida'}, False)
+                break
+
+            cabecalhos = {}
+            while len(cabecalhos) <= MAXIMO_CABECALHOS:
+                linha = await reader.readline()
+                if linha in (b"\r\n", b"\n", b""):
+                    break
+                nome, _, valor = linha.decode("latin-1").partition(":")
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            else:
+                await enviar_json(writer, 400, {'erro': 'cabeçalhos demais'}, False)
+                break
+
+            manter_conexao = cabecalhos.get('connection', '').lower() != 'close' and versao == "HTTP/1.1"
+            tamanho = tamanho_corpo(cabecalhos)
+            if tamanho is None:
+                # O corpo não tem como ser delimitado: responde e fecha a conexão
+                await enviar_json(writer, 400, {'erro': 'Content-Length inválido'}, False)
+                break
+            if tamanho > TAMANHO_MAXIMO_CORPO:
+                await enviar_json(writer, 413, {'erro': 'corpo muito grande'}, False)
+                break
+            corpo = await reader.readexactly(tamanho) if tamanho else b""
+
+            if metodo == "GET" and caminho == "/estatisticas":
+                await enviar_json(writer, 200, micro_lote.estatisticas(), manter_conexao)
+            elif metodo == "POST" and caminho == "/responder":
+                try:
+                    mensagem = json.loads(corpo.decode("utf-8"))['mensagem']
+                    if not isinstance(mensagem, str):
+                        raise TypeError
+                except (ValueError, KeyError, TypeError):
+                    await enviar_json(writer, 400, {'erro': 'esperado JSON {"mensagem": "..."}'}, manter_conexao)
+                else:
+                    try:
+                        resposta, confianca = await micro_lote.responder(mensagem)
+                    except Exception as e:
+                        await enviar_json(writer, 500, {'erro': str(e)}, manter_conexao)
+                    else:
+                        await enviar_json(writer, 200, {'resposta': resposta, 'confianca': confianca}, manter_conexao)
+            else:
+                await enviar_json(writer, 404, {'erro': 'rota não encontrada'}, manter_conexao)
+
+            if not manter_conexao:
+                break
+    except ValueError:
+        # Linha de requisição ou de cabeçalho maior que o limite do StreamReader
+        try:
+            await enviar_json(writer, 400, {'erro': 'linha longa demais'}, False)
+        except ConnectionError:
+            pass
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def servir(chatbot, host, porta, janela_ms, lote_maximo):
+    micro_lote = MicroLote(chatbot, janela_ms, lote_maximo)
+    tarefa_lotes = asyncio.create_task(micro_lote.executar())
+    servidor = await asyncio.start_server(
+        lambda r, w: atender_conexao(r, w, micro_lote), host, porta
+    )
+    print(f"🌐 Servidor ouvindo em http://{host}:{porta} (janela {janela_ms} ms, lote máximo {lote_maximo})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        tarefa_lotes.cancel()
+
+# ==========================================================
+# Execução principal
+# ==========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP do chatbot com micro-lotes")
+    parser.add_argument("--artefato", default=CAMINHO_ARTEFATO, help="diretório do artefato do modelo")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--janela-ms", type=float, default=10, help="tempo de espera para agrupar requisições")
+    parser.add_argument("--lote-maximo", type=int, default=64)
+    args = parser.parse_args()
+
+    try:
+        chatbot = Chatbot(args.artefato)
+    except FileNotFoundError as e:
+        print(f"❌ Artefato do modelo não encontrado: {e}")
+        sys.exit(1)
+
+    try:
+        asyncio.run(servir(chatbot, args.host, args.porta, args.janela_ms, args.lote_maximo))
+    except KeyboardInterrupt:
+        print("👋 Servidor encerrado.")
@@ -4,10 +4,13 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from tensorflow.keras.models import load_model
 import joblib
+from previsao_fertilidade import CLASSES_FERTILIDADE, PrevisorFertilidade
 
 # Carregar modelo, scaler e dados de teste
 modelo = load_model('../Modelos/modelo_fertilidade.keras')
 scaler = joblib.load('../Modelos/scaler_fertilidade.save')
+# Modelo e scaler já carregados, usados em lote (sem um modelo.predict por amostra)
+previsor = PrevisorFertilidade(modelo, scaler)
 dados = np.load('../Modelos/dados_teste.npz', allow_pickle=True)
 X_teste = dados['X_teste']
 y_teste = dados['y_teste']
@@ -70,15 +73,15 @@ def plot_matriz_confusao():
 # Exemplo de predição com novos dados
 def prever_novo():
     print("\nDigite os valores das features para previsão (na ordem do seu CSV):")
+    nomes = previsor.features or [f"Feature {i+1}" for i in range(previsor.n_features)]
     valores = []
-    for i in range(X.shape[1]):
-        valor = float(input(f"Feature {i+1}: "))
+    for nome in nomes:
+        valor = float(input(f"{nome}: "))
         valores.append(valor)
-    novo = np.array(valores).reshape(1, -1)
-    novo_norm = scaler.transform(novo)
-    pred = modelo.predict(novo_norm)
-    classe_predita = np.argmax(pred, axis=1)[0]
-    print('Classe prevista:', classe_predita)
+    # Para muitas amostras, passe todas de uma vez (ou use previsao_fertilidade.py com um CSV)
+    probabilidades = previsor.prever_proba(np.array(valores).reshape(1, -1))[0]
+    classe_predita = int(np.argmax(probabilidades))
+    print('Classe prevista:', classe_predita, f"({CLASSES_FERTILIDADE[classe_predita]}, {probabilidades[classe_predita]:.1%})")
 
 if __name__ == "__main__":
     while True:
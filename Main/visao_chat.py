@@ -0,0 +1,229 @@
+from PySide6.QtCore import Qt, QRect, QSize, Signal
+from PySide6.QtGui import (QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPixmap, QStandardItem,
+                           QStandardItemModel)
+from PySide6.QtWidgets import QAbstractItemView, QListView, QStyledItemDelegate
+
+# ==========================================================
+# Área do chat em model/view
+# ==========================================================
+# Cada mensagem é uma linha do modelo: {'autor': 'usuario' | 'bot' | 'sistema', 'texto': ...}.
+# O delegate desenha só as linhas visíveis, com os avatares carregados uma única vez,
+# e a visão avisa (chegou_ao_topo) quando o usuário rola até o começo, para a janela
+# buscar turnos mais antigos no diário da sessão.
+
+AVATARES = {
+    'usuario': "resources/MelhorPresidente.png",
+    'bot': "resources/FazoL.png",
+}
+NOMES = {
+    'usuario': "Você:",
+    'bot': "Companheiro:",
+}
+TAMANHO_AVATAR = 36
+MARGEM = 10
+ESPACO = 4
+
+COR_TEXTO = QColor("#E8EAED")
+COR_SISTEMA = QColor("#9AA0A6")
+
+_cache_avatares = {}
+
+def avatar(autor):
+    # Pixmap redondo, escalado e recortado uma vez por autor
+    if autor not in _cache_avatares:
+        original = QPixmap(AVATARES[autor])
+        redondo = QPixmap(TAMANHO_AVATAR, TAMANHO_AVATAR)
+        redondo.fill(Qt.GlobalColor.transparent)
+        if not original.isNull():
+            original = original.scaled(TAMANHO_AVATAR, TAMANHO_AVATAR,
+                                       Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+                                       Qt.TransformationMode.SmoothTransformation)
+            painter = QPainter(redondo)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            caminho = QPainterPath()
+            caminho.addEllipse(0, 0, TAMANHO_AVATAR, TAMANHO_AVATAR)
+            painter.setClipPath(caminho)
+            painter.drawPixmap(0, 0, original)
+            painter.end()
+        _cache_avatares[autor] = redondo
+    return _cache_avatares[autor]
+
+# ==========================================================
+# Modelo
+# ==========================================================
+
+class ModeloChat(QStandardItemModel):
+    # Modelo em C++ (QStandardItemModel): as consultas da visão não passam por Python
+    AUTOR = Qt.ItemDataRole.UserRole + 1
+
+    def _item(self, autor, texto):
+        item = QStandardItem(texto)
+        item.setData(autor, self.AUTOR)
+        item.setEditable(False)
+        return item
+
+    def adicionar(self, autor, texto):
+        self.appendRow(self._item(autor, texto))
+        return self.rowCount() - 1
+
+    def adicionar_turnos_no_inicio(self, turnos):
+        # turnos em ordem cronológica
+        linha = 0
+        for c in turnos:
+            self.insertRow(linha, self._item('usuario', str(c['entrada'])))
+            self.insertRow(linha + 1, self._item('bot', str(c['resposta'])))
+            linha += 2
+
+    def definir_texto(self, linha, texto):
+        self.item(linha).setText(texto)
+
+    def remover(self, linha):
+        self.removeRow(linha)
+
+    def limpar(self):
+        self.removeRows(0, self.rowCount())
+
+# ==========================================================
+# Delegate
+# ==========================================================
+
+class DelegadoChat(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # altura por (texto, autor, largura): o layout de uma linha só é refeito quando ela muda
+        self._alturas = {}
+        self._cache_fontes = {}
+
+    def _fontes(self, option):
+        # Variações da fonte montadas uma vez, e não a cada linha desenhada
+        chave = option.font.key()
+        if chave not in self._cache_fontes:
+            fonte = QFont(option.font)
+            negrito = QFont(fonte)
+            negrito.setBold(True)
+            italico = QFont(fonte)
+            italico.setItalic(True)
+            self._cache_fontes[chave] = (fonte, negrito, italico)
+        return self._cache_fontes[chave]
+
+    def _largura_texto(self, largura, autor):
+        if autor == 'sistema':
+            return max(1, largura - 2 * MARGEM)
+        return max(1, largura - 3 * MARGEM - TAMANHO_AVATAR)
+
+    def _largura_visao(self, option):
+        visao = self.parent()
+        return visao.viewport().width() if visao is not None else option.rect.width()
+
+    def sizeHint(self, option, index):
+        texto = index.data(Qt.ItemDataRole.DisplayRole)
+        autor = index.data(ModeloChat.AUTOR)
+        largura = self._largura_visao(option)
+        chave = (texto, autor, largura)
+        if chave not in self._alturas:
+            if len(self._alturas) > 4096:
+                self._alturas.clear()
+            fonte, negrito, italico = self._fontes(option)
+            caixa = QRect(0, 0, self._largura_texto(largura, autor), 1 << 20)
+            if autor == 'sistema':
+                altura = QFontMetrics(italico).boundingRect(caixa, Qt.TextFlag.TextWordWrap, texto).height()
+            else:
+                corpo = QFontMetrics(fonte).boundingRect(caixa, Qt.TextFlag.TextWordWrap, texto).height()
+                altura = max(TAMANHO_AVATAR, QFontMetrics(negrito).height() + ESPACO + corpo)
+            self._alturas[chave] = altura + 2 * MARGEM
+        return QSize(largura, self._alturas[chave])
+
+    def paint(self, painter, option, index):
+        texto = index.data(Qt.ItemDataRole.DisplayRole)
+        autor = index.data(ModeloChat.AUTOR)
+        fonte, negrito, italico = self._fontes(option)
+        area = option.rect.adjusted(MARGEM, MARGEM, -MARGEM, -MARGEM)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if autor == 'sistema':
+            painter.setFont(italico)
+            painter.setPen(COR_SISTEMA)
+            painter.drawText(area, Qt.TextFlag.TextWordWrap, texto)
+        else:
+            painter.drawPixmap(area.left(), area.top(), avatar(autor))
+            x = area.left() + TAMANHO_AVATAR + MARGEM
+            painter.setPen(COR_TEXTO)
+            painter.setFont(negrito)
+            altura_nome = QFontMetrics(negrito).height()
+            painter.drawText(QRect(x, area.top(), area.right() - x, altura_nome), 0, NOMES[autor])
+            painter.setFont(fonte)
+            corpo = QRect(x, area.top() + altura_nome + ESPACO, area.right() - x, area.bottom())
+            painter.drawText(corpo, Qt.TextFlag.TextWordWrap, texto)
+        painter.restore()
+
+# ==========================================================
+# Visão
+# ==========================================================
+
+class VisaoChat(QListView):
+    chegou_ao_topo = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.modelo = ModeloChat(self)
+        self.delegado = DelegadoChat(self)
+        self.setModel(self.modelo)
+        self.setItemDelegate(self.delegado)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setWordWrap(True)
+
+        # Segue o fim da conversa enquanto o usuário estiver lá; ao inserir no topo,
+        # mantém a mesma distância do fim para a tela não pular
+        self._seguir_fim = True
+        self._distancia_do_fim = None
+        # Ligado pela janela enquanto o diário ainda tiver turnos mais antigos para mostrar
+        self.ha_anteriores = False
+        barra = self.verticalScrollBar()
+        barra.valueChanged.connect(self._rolou)
+        barra.rangeChanged.connect(self._faixa_mudou)
+
+    def _rolou(self, valor):
+        barra = self.verticalScrollBar()
+        self._seguir_fim = valor >= barra.maximum() - 4
+        if self.ha_anteriores and valor == barra.minimum() and self._distancia_do_fim is None:
+            self.chegou_ao_topo.emit()
+
+    def _faixa_mudou(self, minimo, maximo):
+        barra = self.verticalScrollBar()
+        if self._distancia_do_fim is not None:
+            barra.setValue(maximo - self._distancia_do_fim)
+            self._distancia_do_fim = None
+        elif self._seguir_fim:
+            barra.setValue(maximo)
+        if self.ha_anteriores and maximo == minimo:
+            # Conteúdo ainda não enche a tela: pede mais turnos antigos
+            self.chegou_ao_topo.emit()
+
+    def preservar_posicao(self):
+        barra = self.verticalScrollBar()
+        self._distancia_do_fim = barra.maximum() - barra.value()
+
+    def adicionar(self, autor, texto):
+        return self.modelo.adicionar(autor, texto)
+
+    def adicionar_turnos_no_inicio(self, turnos):
+        if turnos:
+            self.preservar_posicao()
+            self.modelo.adicionar_turnos_no_inicio(turnos)
+
+    def definir_texto(self, linha, texto):
+        self.modelo.definir_texto(linha, texto)
+
+    def remover(self, linha):
+        self.modelo.remover(linha)
+
+    def limpar(self):
+        self._seguir_fim = True
+        self._distancia_do_fim = None
+        self.ha_anteriores = False
+        self.modelo.limpar()
@@ -0,0 +1,207 @@
+import time
+import numpy as np
+from indice_semantico import construir_indice, normalizar_linhas
+
+# ==========================================================
+# Votação top-k por resposta e por intent
+# ==========================================================
+# Em vez de confiar só no vizinho mais próximo, pega os k vizinhos, pesa cada um por
+# exp((sim - sim_max) / temperatura) e soma os pesos por intent e por resposta:
+#   1) vence a intent com mais massa entre os k vizinhos
+#   2) dentro dela, vence a resposta com mais massa
+#   3) a linha devolvida é o vizinho mais próximo com essa resposta
+# A intent 'nao_entendido' é a classe de rejeição explícita: quando ela vence, a
+# resposta é uma das respostas de rejeição do banco.
+#
+# A confiança devolvida é calibrada (regressão logística sobre similaridade e fatias
+# de voto, ajustada em uma divisão separada do CSV) e estima P(resposta correta);
+# sem calibração, é a similaridade do vizinho vencedor, como no argmax.
+# Tudo é vetorizado sobre (consultas × k): custa pouco mais que o argmax.
+
+INTENT_REJEICAO = 'nao_entendido'
+K_PADRAO = 10
+TEMPERATURA_PADRAO = 0.05
+
+def codificar_rotulos(valores, vocabulario=None):
+    # Rótulos -> (ids int32 por linha, vocabulário na ordem de primeira aparição).
+    # Passando o mesmo dict de vocabulário, os ids continuam de um bloco para o outro.
+    vocabulario = {} if vocabulario is None else vocabulario
+    ids = np.fromiter((vocabulario.setdefault(str(v), len(vocabulario)) for v in valores), dtype=np.int32)
+    return ids, list(vocabulario)
+
+def _massas(rotulos, pesos):
+    # Para cada posição (..., i): soma dos pesos das posições com o mesmo rótulo
+    iguais = rotulos[..., :, None] == rotulos[..., None, :]
+    return np.einsum('...ij,...j->...i', iguais, pesos)
+
+def votar(indices, similaridades, resposta_ids, intent_ids, temperatura=TEMPERATURA_PADRAO):
+    # indices / similaridades: (consultas, k), cada linha em ordem decrescente de similaridade
+    pesos = np.exp((similaridades - similaridades[:, :1]) / temperatura)
+    total = pesos.sum(axis=1)
+    intents = intent_ids[indices]
+    massa_intent = _massas(intents, pesos)
+    massa_resposta = _massas(resposta_ids[indices], pesos)
+
+    chave = np.where(massa_intent == massa_intent.max(axis=1, keepdims=True), massa_resposta, -1.0)
+    posicao = chave.argmax(axis=1)
+    linhas = np.arange(len(indices))
+    return {
+        'linha': indices[linhas, posicao],
+        'similaridade': similaridades[linhas, posicao],
+        'fatia_resposta': massa_resposta[linhas, posicao] / total,
+        'fatia_intent': massa_intent[linhas, posicao] / total,
+        'intent': intents[linhas, posicao],
+    }
+
+# ==========================================================
+# Calibração da confiança
+# ==========================================================
+
+def _caracteristicas(voto):
+    return np.stack([voto['similaridade'], voto['fatia_resposta'], voto['fatia_intent'],
+                     np.ones(len(voto['linha']), dtype=np.float32)], axis=1).astype(np.float64)
+
+def calibrar(voto, acertos, iteracoes=25, regularizacao=1e-3):
+    # Regressão logística (Newton) de acerto ~ [similaridade, fatia_resposta, fatia_intent, 1]
+    x = _caracteristicas(voto)
+    y = np.asarray(acertos, dtype=np.float64)
+    w = np.zeros(x.shape[1])
+    for _ in range(iteracoes):
+        p = 1.0 / (1.0 + np.exp(-(x @ w)))
+        gradiente = x.T @ (p - y) + regularizacao * w
+        hessiana = (x * (p * (1 - p))[:, None]).T @ x + regularizacao * np.eye(len(w))
+        w -= np.linalg.solve(hessiana, gradiente)
+    return [float(v) for v in w]
+
+def confianca(voto, calibracao=None):
+    if calibracao is None:
+        return voto['similaridade'].astype(np.float64)
+    return 1.0 / (1.0 + np.exp(-(_caracteristicas(voto) @ np.asarray(calibracao))))
+
+# ==========================================================
+# Modo de recuperação com a mesma interface dos backends
+# ==========================================================
+
+class VotacaoTopK:
+    tipo = 'votacao'
+
+    def __init__(self, indice, resposta_ids, intent_ids, intents, k=K_PADRAO,
+                 temperatura=TEMPERATURA_PADRAO, calibracao=None):
+        self.indice = indice
+        self.resposta_ids = np.asarray(resposta_ids)
+        self.intent_ids = np.asarray(intent_ids)
+        self.intents = list(intents)
+        self.k = k
+        self.temperatura = temperatura
+        self.calibracao = calibracao
+
+    @property
+    def embeddings_norm(self):
+        return self.indice.embeddings_norm
+
+    def votar_lote(self, embeddings):
+        return self.votar_top_k(*self.indice.buscar_top_k_lote(embeddings, self.k))
+
+    def votar_top_k(self, indices, similaridades):
+        # Vota sobre vizinhos já buscados (ex.: junto com as alternativas do modo em lote)
+        voto = votar(indices[:, :self.k], similaridades[:, :self.k], self.resposta_ids, self.intent_ids,
+                     self.temperatura)
+        voto['confianca'] = confianca(voto, self.calibracao)
+        return voto
+
+    def buscar(self, embedding):
+        return self.buscar_lote(np.atleast_2d(embedding))[0]
+
+    def buscar_lote(self, embeddings):
+        voto = self.votar_lote(embeddings)
+        return [(int(i), float(c)) for i, c in zip(voto['linha'], voto['confianca'])]
+
+    def buscar_top_k(self, embedding, k=10):
+        return self.indice.buscar_top_k(embedding, k)
+
+    def buscar_top_k_lote(self, embeddings, k=10):
+        return self.indice.buscar_top_k_lote(embeddings, k)
+
+def carregar_votacao(artefato, indice):
+    # Usa a votação quando a build gravou a configuração dela e os rótulos por linha
+    configuracao = artefato.manifesto.get('votacao')
+    rotulos = artefato.rotulos()
+    if not configuracao or rotulos is None:
+        return indice
+    resposta_ids, intent_ids, intents = rotulos
+    return VotacaoTopK(indice, resposta_ids, intent_ids, intents, configuracao.get('k', K_PADRAO),
+                       configuracao.get('temperatura', TEMPERATURA_PADRAO), configuracao.get('calibracao'))
+
+def respostas_rejeicao(respostas, rotulos):
+    # Textos das respostas das linhas 'nao_entendido': é uma delas que sai quando a classe
+    # de rejeição vence (na votação ou no argmax), mesmo com confiança acima do limiar
+    if rotulos is None or INTENT_REJEICAO not in rotulos[2]:
+        return frozenset()
+    resposta_ids, intent_ids, intents = rotulos
+    linhas = np.flatnonzero(np.asarray(intent_ids) == intents.index(INTENT_REJEICAO))
+    _, primeiras = np.unique(np.asarray(resposta_ids)[linhas], return_index=True)
+    return frozenset(respostas[int(linhas[i])] for i in primeiras)
+
+# ==========================================================
+# Avaliação: acurácia × latência em uma divisão separada
+# ==========================================================
+
+def _acertos(linhas, rejeitadas, respostas_banco, respostas_teste, intents_teste):
+    # Acerto: a resposta certa, ou uma rejeição quando a pergunta era mesmo fora do escopo
+    return np.array([
+        (intent == INTENT_REJEICAO and rejeitada) or (not rejeitada and respostas_banco[linha] == resposta)
+        for linha, rejeitada, resposta, intent in zip(linhas, rejeitadas, respostas_teste, intents_teste)
+    ])
+
+def avaliar_votacao(embeddings_banco, respostas_banco, intents_banco, embeddings_teste, respostas_teste,
+                    intents_teste, backend='exaustiva', ks=(5, 10, 20), temperatura=TEMPERATURA_PADRAO,
+                    limiar=0.65, fracao_calibracao=0.5, semente=42):
+    # As consultas de teste são divididas em duas metades: uma ajusta a calibração,
+    # a outra mede acurácia e latência de cada modo.
+    indice = construir_indice(backend, embeddings_banco, respostas_banco)
+    resposta_ids, _ = codificar_rotulos(respostas_banco)
+    intent_ids, intents = codificar_rotulos(intents_banco)
+    id_rejeicao = intents.index(INTENT_REJEICAO) if INTENT_REJEICAO in intents else -1
+    consultas = normalizar_linhas(embeddings_teste)
+    respostas_teste = list(respostas_teste)
+    intents_teste = list(intents_teste)
+
+    ordem = np.random.default_rng(semente).permutation(len(consultas))
+    n_calibracao = int(len(consultas) * fracao_calibracao)
+    calib, aval = ordem[:n_calibracao], ordem[n_calibracao:]
+
+    def medir(funcao, idx):
+        inicio = time.perf_counter()
+        resultado = [funcao(consultas[i]) for i in idx]
+        return resultado, 1000 * (time.perf_counter() - inicio) / max(len(idx), 1)
+
+    resultados = []
+    escolhas, latencia = medir(indice.buscar, aval)
+    linhas = [i for i, _ in escolhas]
+    rejeitadas = [c < limiar for _, c in escolhas]
+    acertos = _acertos(linhas, rejeitadas, respostas_banco, [respostas_teste[i] for i in aval],
+                       [intents_teste[i] for i in aval])
+    resultados.append({'modo': 'argmax', 'k': 1, 'acuracia': float(acertos.mean()) if len(acertos) else 0.0,
+                       'latencia_ms': latencia, 'rejeicao': float(np.mean(rejeitadas)) if rejeitadas else 0.0})
+
+    melhor = None
+    for k in ks:
+        votacao = VotacaoTopK(indice, resposta_ids, intent_ids, intents, k, temperatura)
+        # Calibração na primeira metade; o limiar passa a valer sobre P(acerto)
+        voto_calib = votacao.votar_lote(consultas[calib])
+        acertos_calib = _acertos(voto_calib['linha'], voto_calib['intent'] == id_rejeicao, respostas_banco,
+                                 [respostas_teste[i] for i in calib], [intents_teste[i] for i in calib])
+        votacao.calibracao = calibrar(voto_calib, acertos_calib)
+
+        _, latencia = medir(votacao.buscar, aval)
+        voto = votacao.votar_lote(consultas[aval])
+        rejeitadas = (voto['intent'] == id_rejeicao) | (voto['confianca'] < limiar)
+        acertos = _acertos(voto['linha'], rejeitadas, respostas_banco, [respostas_teste[i] for i in aval],
+                           [intents_teste[i] for i in aval])
+        resultado = {'modo': 'votacao', 'k': k, 'acuracia': float(acertos.mean()) if len(acertos) else 0.0,
+                     'latencia_ms': latencia, 'rejeicao': float(rejeitadas.mean()) if len(rejeitadas) else 0.0,
+                     'temperatura': temperatura, 'calibracao': votacao.calibracao}
+        resultados.append(resultado)
+        if melhor is None or resultado['acuracia'] > melhor['acuracia']:
+            melhor = resultado
+    return resultados, melhor
@@ -8,6 +8,10 @@ from tensorflow.keras.utils import to_categorical
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main')))
+from modelo_numpy import exportar_npz
 
 # Carregar dados
 caminho_csv = r'C:\Users\zCarlin\Desktop\ChatBot-Teste-main\ChatBot-Teste-main\Dados\Solos.csv'
@@ -53,4 +57,6 @@ os.makedirs(PASTA_MODELOS, exist_ok=True)
 modelo_solo.save(os.path.join(PASTA_MODELOS, 'modelo_fertilidade.keras'))
 joblib.dump(scaler, os.path.join(PASTA_MODELOS, 'scaler_fertilidade.save'))
 np.savez_compressed(os.path.join(PASTA_MODELOS, 'dados_teste.npz'), X_teste=X_treino, y_teste=y_treino, X=X, y=y)
+# Versão NumPy da rede (BatchNorm dobrada, sem Dropout) para prever sem TensorFlow
+exportar_npz(modelo_solo, scaler, os.path.join(PASTA_MODELOS, 'modelo_fertilidade.npz'))
 print('Modelo, scaler e dados de teste salvos com sucesso na pasta Modelos!')
\ No newline at end of file
@@ -1,120 +1,264 @@
 import pandas as pd
 import os
-import unicodedata
-import string
-import joblib
-import json
-import datetime
+import sys
 import time
-import glob
-import re
-import torch
+import shutil
+import hashlib
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 
-# ===============================
-# Função de pré-processamento
-def preprocessar_texto(texto):
-    texto = texto.lower()
-    texto = ''.join(c for c in unicodedata.normalize('NFD', texto)
-                    if unicodedata.category(c) != 'Mn')
-    texto = texto.translate(str.maketrans('', '', string.punctuation))
-    texto = ' '.join(texto.split())
-    return texto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Main')))
+from indice_semantico import (BACKENDS, PRECISOES, avaliar_quantizacao, construir_indice,
+                              cobertura_correspondencia_exata, deduplicar_perguntas, verificar_recall)
+from artefato import CAMINHO_ARTEFATO, Artefato, EscritorArtefato, salvar_artefato
+from armazem_sessoes import ArmazemSessoes, iterar_turnos, ler_cabecalho
+from pipeline_embeddings import codificar_em_blocos, preparar_execucao
+from votacao import avaliar_votacao
+from normalizacao import assinatura_normalizacao, normalizar_serie, preprocessar_texto
+from contexto import EstadoConversa
+from motor_chatbot import Chatbot
 
 # ===============================
 # Carregar e preparar os dados
-def carregar_dados(caminho_csv):
-    df = pd.read_csv(caminho_csv, sep=';', encoding='utf-8')
-    df['input_text'] = df['input_text'].astype(str).apply(preprocessar_texto)
-    return df
+def ler_csv_em_blocos(caminho_csv, tamanho_bloco=50000):
+    for bloco in pd.read_csv(caminho_csv, sep=';', encoding='utf-8', chunksize=tamanho_bloco):
+        bloco['input_text'] = normalizar_serie(bloco['input_text'])
+        yield bloco
+
+def carregar_dados(caminho_csv, tamanho_bloco=50000):
+    return pd.concat(ler_csv_em_blocos(caminho_csv, tamanho_bloco), ignore_index=True)
 
 # ===============================
-# Salvar modelo e dados como .pkl
-def salvar_modelo_e_dados(modelo_st, embeddings, df, caminho='modelo_semantico.pkl'):
-    print("💾 Salvando modelo e dados em .pkl...")
-    
-    joblib.dump({
-        'modelo': modelo_st,
-        'embeddings': embeddings.cpu().numpy(),  # Convertido para numpy (mais leve)
-        'respostas': df['resposta'].tolist(),
-        'perguntas': df['input_text'].tolist()
-    }, caminho)
+# Reconstrução incremental dos embeddings
+def hash_texto(texto):
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def atualizar_digest(h, df):
+    for linha in df[['intent', 'input_text', 'resposta']].astype(str).itertuples(index=False):
+        h.update('\x1f'.join(linha).encode('utf-8'))
+        h.update(b'\x1e')
+
+def digest_dados(df):
+    # Impressão digital do CSV já normalizado: muda com qualquer linha editada, incluída ou removida
+    h = hashlib.sha1()
+    atualizar_digest(h, df)
+    return h.hexdigest()
+
+def digest_csv(caminho_csv, tamanho_bloco=50000):
+    # O mesmo digest_dados, lendo o CSV aos blocos (sem carregar o DataFrame inteiro)
+    h = hashlib.sha1()
+    for bloco in ler_csv_em_blocos(caminho_csv, tamanho_bloco):
+        atualizar_digest(h, bloco)
+    return h.hexdigest()
+
+def ordenar_cache(cache_anterior):
+    # (hashes ordenados, posição de cada um no cache, embeddings do cache) para consultas com searchsorted
+    if cache_anterior is None:
+        return None
+    hashes_ant, embeddings_ant = cache_anterior
+    ordem = np.argsort(hashes_ant)
+    return hashes_ant[ordem], ordem, embeddings_ant
+
+def consultar_cache(cache_ordenado, hashes):
+    # Máscara dos hashes encontrados e a linha do cache de cada um (válida só onde a máscara é True)
+    if cache_ordenado is None or not len(cache_ordenado[0]):
+        return np.zeros(len(hashes), dtype=bool), np.zeros(len(hashes), dtype=np.int64)
+    hashes_ordenados, ordem, _ = cache_ordenado
+    posicoes = np.minimum(np.searchsorted(hashes_ordenados, hashes), len(ordem) - 1)
+    return hashes_ordenados[posicoes] == hashes, ordem[posicoes]
+
+def gerar_embeddings_incremental(modelo_st, df, cache_anterior=None, pasta_blocos='modelo_semantico.blocos',
+                                 tamanho_bloco=4096, processos=1, batch_size=64):
+    # Codifica só os textos normalizados que ainda não têm embedding no artefato anterior.
+    # Retorna os embeddings por linha do df e o novo cache (hashes, embeddings) por texto distinto.
+    codigos, unicos = pd.factorize(df['input_text'])
+    hashes = np.fromiter((hash_texto(t) for t in unicos), dtype=np.uint64, count=len(unicos))
+    embeddings_unicos = np.zeros((len(unicos), modelo_st.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    cache_ordenado = ordenar_cache(cache_anterior)
+    reaproveitados, linhas_cache = consultar_cache(cache_ordenado, hashes)
+    removidos = 0
+    if cache_ordenado is not None:
+        embeddings_unicos[reaproveitados] = cache_ordenado[2][linhas_cache[reaproveitados]]
+        # Textos distintos do cache que não aparecem mais: o cache de um artefato em streaming
+        # é por linha e repete hashes, então contar linhas superestimaria
+        removidos = len(np.setdiff1d(cache_ordenado[0], hashes))
+
+    novos = np.flatnonzero(~reaproveitados)
+    print(f"♻️ Embeddings: {int(reaproveitados.sum())} reaproveitados, {len(novos)} novos/alterados, {removidos} removidos")
+    if len(novos):
+        print(f"🧠 Gerando embeddings de {len(novos)} perguntas...")
+        embeddings_unicos[novos] = codificar_em_blocos(modelo_st, [unicos[i] for i in novos], pasta_blocos,
+                                                       tamanho_bloco, processos, batch_size)
+
+    return embeddings_unicos[codigos], (hashes, embeddings_unicos)
+
+# ===============================
+# Deduplicar perguntas e montar o índice de centróides
+def deduplicar_banco(embeddings, df, limiar_duplicata=0.97):
+    print("🧹 Removendo perguntas duplicadas e quase-duplicadas...")
+    mantidos = deduplicar_perguntas(df['input_text'].tolist(), df['resposta'].tolist(),
+                                    embeddings, limiar_duplicata)
+    df_dedup = df.iloc[mantidos].reset_index(drop=True)
+    embeddings_dedup = embeddings[mantidos]
+    print(f"✅ {len(df)} linhas -> {len(df_dedup)} perguntas ({df_dedup['resposta'].nunique()} respostas)")
+    return embeddings_dedup, df_dedup
+
+# ===============================
+# Verificar recall do índice em uma divisão separada
+def verificar_recall_indice(embeddings, df, backend='centroides', fracao_teste=0.1, semente=42):
+    print(f"🔬 Verificando recall do backend '{backend}' contra a busca exaustiva...")
+    ordem = np.random.default_rng(semente).permutation(len(df))
+    n_teste = int(len(df) * fracao_teste)
+    idx_teste, idx_treino = np.sort(ordem[:n_teste]), np.sort(ordem[n_teste:])
+
+    df_treino = df.iloc[idx_treino].reset_index(drop=True)
+    embeddings_treino, df_treino = deduplicar_banco(embeddings[idx_treino], df_treino)
+    embeddings_teste = embeddings[idx_teste]
+
+    recall = verificar_recall(embeddings_treino, df_treino['resposta'].tolist(),
+                              embeddings_teste, backend)
+    print(f"📊 Concordância com a busca exaustiva ({n_teste} perguntas): {recall:.2%}")
+    return recall
+
+# ===============================
+# Votação top-k: acurácia × latência em uma divisão separada e calibração da confiança
+def avaliar_votacao_holdout(embeddings, df, backend='centroides', fracao_teste=0.1, semente=42):
+    print(f"🗳️ Avaliando votação top-k contra o argmax (backend '{backend}')...")
+    ordem = np.random.default_rng(semente).permutation(len(df))
+    n_teste = int(len(df) * fracao_teste)
+    idx_teste, idx_treino = np.sort(ordem[:n_teste]), np.sort(ordem[n_teste:])
+
+    df_treino = df.iloc[idx_treino].reset_index(drop=True)
+    embeddings_treino, df_treino = deduplicar_banco(embeddings[idx_treino], df_treino)
+    df_teste = df.iloc[idx_teste]
+
+    resultados, melhor = avaliar_votacao(
+        embeddings_treino, df_treino['resposta'].tolist(), df_treino['intent'].tolist(),
+        embeddings[idx_teste], df_teste['resposta'].tolist(), df_teste['intent'].tolist(), backend)
+    for r in resultados:
+        print(f"   {r['modo']:>8} k={r['k']:<3} acurácia {r['acuracia']:.2%} | "
+              f"rejeição {r['rejeicao']:.2%} | {r['latencia_ms']:.3f} ms/consulta")
+    print(f"✅ Votação com k={melhor['k']} será usada no artefato")
+    return {'k': melhor['k'], 'temperatura': melhor['temperatura'], 'calibracao': melhor['calibracao']}
+
+# ===============================
+# Salvar modelo e dados no diretório do artefato
+def salvar_modelo_e_dados(modelo_st, embeddings, df, caminho=CAMINHO_ARTEFATO, backend='centroides',
+                          cache_embeddings=None, digest=None, precisao='float32', votacao=None):
+    print(f"🗂️ Construindo índice de recuperação '{backend}'...")
+    indice = construir_indice(backend, embeddings, df['resposta'])
+
+    print("💾 Salvando modelo e dados no artefato...")
+    metadados = {'digest_dados': digest, 'normalizacao': assinatura_normalizacao()}
+    if votacao is not None:
+        metadados['votacao'] = votacao
+    salvar_artefato(caminho, modelo_st, embeddings, df['input_text'], df['resposta'], indice,
+                    metadados=metadados, cache_embeddings=cache_embeddings, precisao=precisao,
+                    intents=df['intent'])
 
     print(f"✅ Modelo e dados salvos em: {caminho}")
 
 # ===============================
-# Carregar modelo e dados .pkl
-def carregar_modelo_e_dados(caminho='modelo_semantico.pkl'):
-    print("📂 Carregando modelo e dados de .pkl...")
-    
-    dados = joblib.load(caminho)
-    modelo_st = dados['modelo']
-    embeddings = torch.tensor(dados['embeddings'])  # Reconvertido para tensor
-    perguntas = dados['perguntas']
-    respostas = dados['respostas']
+# Build em streaming: CSV -> normalização -> embeddings -> artefato, bloco a bloco
+def construir_artefato_em_blocos(caminho_csv, modelo_st, caminho=CAMINHO_ARTEFATO, backend='centroides',
+                                 reaproveitar_cache=False, digest=None, precisao='float32', votacao=None,
+                                 linhas_por_bloco=50000, pasta_blocos='modelo_semantico.blocos',
+                                 tamanho_bloco=4096, processos=1, batch_size=64):
+    # Para bases grandes demais para caber em um DataFrame: só um bloco do CSV fica em memória
+    # por vez. Duplicatas exatas (pergunta, resposta) são removidas na execução inteira, e uma
+    # pergunta já gravada em um bloco anterior reaproveita o embedding daquela linha; a remoção
+    # de quase-duplicatas do deduplicar_banco precisa do banco inteiro e fica de fora.
+    # Com reaproveitar_cache, os embeddings do artefato anterior são lidos em mmap
+    # (só os hashes vão para a memória) e soltos antes de ele ser substituído.
+    cache_anterior = None
+    if reaproveitar_cache and os.path.isdir(caminho):
+        cache_anterior = Artefato(caminho).cache_embeddings('r')
+    cache_ordenado = ordenar_cache(cache_anterior)
+    escritor = EscritorArtefato(caminho, modelo_st, modelo_st.get_sentence_embedding_dimension(), precisao)
+    # Blocos do encode retomáveis enquanto o CSV e os tamanhos de bloco forem os mesmos
+    preparar_execucao(pasta_blocos, {'digest_dados': digest, 'linhas_por_bloco': linhas_por_bloco,
+                                     'tamanho_bloco': tamanho_bloco, 'reaproveitar_cache': cache_ordenado is not None})
+    pares_vistos = set()  # hash de (pergunta, resposta) já gravado
+    linha_do_texto = {}   # hash da pergunta -> linha do artefato com o embedding dela
+    reaproveitados_total = repetidos_total = novos_total = linhas_csv = 0
+
+    for n, bloco in enumerate(ler_csv_em_blocos(caminho_csv, linhas_por_bloco)):
+        linhas_csv += len(bloco)
+        mantidas = []
+        for i, par in enumerate(zip(bloco['input_text'], bloco['resposta'].astype(str))):
+            h = hash_texto('\x1f'.join(par))
+            if h not in pares_vistos:
+                pares_vistos.add(h)
+                mantidas.append(i)
+        bloco = bloco.iloc[mantidas]
+        codigos, unicos = pd.factorize(bloco['input_text'])
+        hashes = np.fromiter((hash_texto(t) for t in unicos), dtype=np.uint64, count=len(unicos))
+        embeddings_unicos = np.empty((len(unicos), escritor.dimensao), dtype=np.float32)
+
+        linhas_anteriores = np.fromiter((linha_do_texto.get(int(h), -1) for h in hashes), dtype=np.int64,
+                                        count=len(hashes))
+        repetidos = linhas_anteriores >= 0
+        if repetidos.any():
+            embeddings_unicos[repetidos] = escritor.embeddings_das_linhas(linhas_anteriores[repetidos])
+        reaproveitados, linhas_cache = consultar_cache(cache_ordenado, hashes)
+        reaproveitados &= ~repetidos
+        if reaproveitados.any():
+            embeddings_unicos[reaproveitados] = cache_ordenado[2][linhas_cache[reaproveitados]]
+        novos = np.flatnonzero(~(repetidos | reaproveitados))
+        if len(novos):
+            embeddings_unicos[novos] = codificar_em_blocos(
+                modelo_st, [unicos[i] for i in novos], os.path.join(pasta_blocos, f'csv_{n:05d}'),
+                tamanho_bloco, processos, batch_size, limpar=False)
+        reaproveitados_total += int(reaproveitados.sum())
+        repetidos_total += int(repetidos.sum())
+        novos_total += len(novos)
+
+        # Linha da primeira ocorrência de cada pergunta nova neste bloco
+        primeiras = np.unique(codigos, return_index=True)[1]
+        for i in np.flatnonzero(~repetidos):
+            linha_do_texto[int(hashes[i])] = escritor.linhas + int(primeiras[i])
+        escritor.adicionar(embeddings_unicos[codigos], bloco['input_text'], bloco['resposta'], bloco['intent'],
+                           hashes[codigos])
+        print(f"📥 Bloco {n + 1} do CSV: {linhas_csv} linhas lidas, {escritor.linhas} no artefato")
 
-    return modelo_st, embeddings, perguntas, respostas
+    cache_ordenado = cache_anterior = None
+    print(f"♻️ Embeddings: {reaproveitados_total} reaproveitados, {novos_total} novos/alterados, "
+          f"{repetidos_total} repetidos de blocos anteriores")
+    print(f"🗂️ Construindo índice de recuperação '{backend}' sobre o embeddings.npy em mmap...")
+    metadados = {'digest_dados': digest, 'normalizacao': assinatura_normalizacao()}
+    if votacao is not None:
+        metadados['votacao'] = votacao
+    escritor.concluir(backend, metadados)
+    shutil.rmtree(pasta_blocos, ignore_errors=True)
+    print(f"✅ {linhas_csv} linhas do CSV -> {escritor.linhas} perguntas salvas em: {caminho}")
 
 # ===============================
-# Memória contextual
-def extrair_contexto(entrada):
-    contexto = {
-        'tipo_solo': None,
-        'nivel_fertilidade': None,
-        'problema': None,
-        'acao_desejada': None
-    }
-    entrada_lower = entrada.lower()
-    
-    tipos_solo = ['arenoso', 'argiloso', 'humoso', 'calcário', 'ácido', 'alcalino']
-    for tipo in tipos_solo:
-        if tipo in entrada_lower:
-            contexto['tipo_solo'] = tipo
-            break
-    
-    niveis = ['alta', 'média', 'baixa', 'alta fertilidade', 'média fertilidade', 'baixa fertilidade']
-    for nivel in niveis:
-        if nivel in entrada_lower:
-            contexto['nivel_fertilidade'] = nivel
-            break
-    
-    problemas = ['seco', 'úmido', 'compactado', 'fraco', 'pobre', 'ácido', 'alcalino']
-    for problema in problemas:
-        if problema in entrada_lower:
-            contexto['problema'] = problema
-            break
-    
-    acoes = ['melhorar', 'adubar', 'nutrir', 'fortalecer', 'recuperar', 'corrigir']
-    for acao in acoes:
-        if acao in entrada_lower:
-            contexto['acao_desejada'] = acao
-            break
-    
-    return contexto
-
-def atualizar_contexto(contexto_atual, nova_entrada):
-    novo_contexto = extrair_contexto(nova_entrada)
-    contexto_final = contexto_atual.copy() if contexto_atual else {}
-    for k, v in novo_contexto.items():
-        if v:
-            contexto_final[k] = v
-    return contexto_final
-
-def expandir_pergunta_com_contexto(entrada, contexto_anterior):
-    if not contexto_anterior:
-        return entrada
-    
-    if re.search(r'\b(ele|ela|isso|isso mesmo)\b', entrada.lower()):
-        pergunta_expandida = entrada
-        if contexto_anterior.get('tipo_solo'):
-            pergunta_expandida = f"meu solo {contexto_anterior['tipo_solo']} {entrada}"
-        elif contexto_anterior.get('nivel_fertilidade'):
-            pergunta_expandida = f"meu solo com {contexto_anterior['nivel_fertilidade']} {entrada}"
-        elif contexto_anterior.get('problema'):
-            pergunta_expandida = f"meu solo {contexto_anterior['problema']} {entrada}"
-        return pergunta_expandida
-    return entrada
+# Comparar armazenamento quantizado com o float32
+def avaliar_quantizacao_artefato(caminho=CAMINHO_ARTEFATO, precisoes=('float16', 'int8'), rerank_k=10,
+                                 n_consultas=2000, semente=42):
+    artefato = Artefato(caminho)
+    cache = artefato.cache_embeddings()
+    if cache is None:
+        print("❌ Artefato sem cache de textos; reconstrua-o para avaliar a quantização.")
+        return []
+    # Consultas: textos distintos do CSV (inclui as paráfrases removidas na deduplicação)
+    consultas = cache[1]
+    if len(consultas) > n_consultas:
+        consultas = consultas[np.random.default_rng(semente).choice(len(consultas), n_consultas, replace=False)]
+
+    respostas = list(artefato.respostas)
+    resultados = []
+    for precisao in precisoes:
+        r = avaliar_quantizacao(artefato.embeddings, respostas, consultas, precisao, rerank_k)
+        print(f"📦 {precisao}: {r['bytes_float32'] / 2**20:.1f} MB -> {r['bytes_compacta'] / 2**20:.1f} MB "
+              f"({r['memoria_economizada']:.0%} a menos)")
+        print(f"   latência/consulta: float32 {r['latencia_ms_float32']:.2f} ms | compacta {r['latencia_ms_compacta']:.2f} ms"
+              f" | compacta + re-rank top-{rerank_k} {r['latencia_ms_compacta_rerank']:.2f} ms")
+        print(f"   concordância com float32: {r['concordancia_compacta']:.2%} "
+              f"(com re-rank: {r['concordancia_compacta_rerank']:.2%}) em {r['consultas']} consultas")
+        resultados.append(r)
+    return resultados
 
 # ===============================
 # Histórico de sessões
@@ -122,48 +266,50 @@ def criar_pasta_historico(pasta='historico'):
     os.makedirs(pasta, exist_ok=True)
     return pasta
 
-def salvar_sessao(id_sessao, conversas, pasta='historico'):
-    dados = {
-        "id": id_sessao,
-        "data": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "conversas": conversas
-    }
-    caminho_arquivo = os.path.join(pasta, f"{id_sessao}.json")
-    with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-
-def listar_sessoes(pasta='historico'):
-    arquivos = glob.glob(os.path.join(pasta, "*.json"))
-    sessoes = []
-    for arq in arquivos:
-        try:
-            with open(arq, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                sessoes.append({'arquivo': arq, 'id': dados['id'], 'data': dados['data']})
-        except:
-            pass
-    return sorted(sessoes, key=lambda x: x['data'], reverse=True)
+# Um único ArmazemSessoes por sessão do console (conexão SQLite + varredura da pasta),
+# passado para as funções abaixo e fechado na saída
+def salvar_sessao(armazem, id_sessao, conversas):
+    armazem.salvar(id_sessao, conversas)
+
+def listar_sessoes(armazem):
+    # Metadados vêm do índice SQLite; nenhum JSON de sessão é aberto aqui
+    return armazem.listar()
 
 def carregar_sessao(arquivo):
-    with open(arquivo, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    # Sessão inteira em memória; para sessões longas prefira iterar_turnos
+    cabecalho = ler_cabecalho(arquivo)
+    return {'id': cabecalho['id'], 'data': cabecalho['data'], 'conversas': list(iterar_turnos(arquivo))}
 
 def gerar_id_sessao():
     timestamp = int(time.time())
     return f"sessao_{timestamp}"
 
+# ===============================
+# Quanto do tráfego histórico o atalho de correspondência exata atenderia
+def relatorio_correspondencia_exata(indice_exato, armazem):
+    entradas = []
+    for sessao in listar_sessoes(armazem):
+        try:
+            entradas.extend(preprocessar_texto(str(c['entrada'])) for c in iterar_turnos(sessao['arquivo']))
+        except (OSError, ValueError, KeyError):
+            continue
+
+    atendidas, total = cobertura_correspondencia_exata(entradas, indice_exato)
+    fracao = atendidas / total if total else 0.0
+    print(f"🎯 Correspondência exata: {atendidas}/{total} mensagens do histórico ({fracao:.1%}) dispensariam o transformer")
+    return fracao
+
 # ===============================
 # Chatbot com memória contextual
-def iniciar_chat_semantico(modelo_st, embeddings_perguntas, perguntas, respostas):
+def iniciar_chat_semantico(chatbot, armazem):
     print("\n🌱 Chatbot de Fertilidade do Solo (semântico e com contexto)")
     print("Digite uma frase sobre seu solo. Ex: 'meu solo está fraco e seco'")
     print("Digite 'sair' para encerrar.\n")
     
-    criar_pasta_historico()
-    
-    sessoes = listar_sessoes()
-    conversas = []
-    contexto_atual = None
+    sessoes = listar_sessoes(armazem)
+    id_sessao = gerar_id_sessao()
+    diario = armazem.abrir_diario(id_sessao)
+    estado = EstadoConversa()
     
     if sessoes:
         resposta = input("Deseja continuar uma sessão anterior? (sim/não): ").strip().lower()
@@ -174,73 +320,143 @@ def iniciar_chat_semantico(modelo_st, embeddings_perguntas, perguntas, respostas
             try:
                 escolha = int(input("Escolha o número da sessão: "))
                 if 1 <= escolha <= len(sessoes):
-                    dados_sessao = carregar_sessao(sessoes[escolha-1]['arquivo'])
-                    conversas = dados_sessao['conversas']
-                    print(f"\n📜 Histórico da sessão {dados_sessao['id']} ({dados_sessao['data']}):")
-                    for c in conversas:
+                    # Os turnos antigos são lidos um a um e copiados para o diário da nova sessão
+                    arquivo = sessoes[escolha-1]['arquivo']
+                    cabecalho = ler_cabecalho(arquivo)
+                    print(f"\n📜 Histórico da sessão {cabecalho['id']} ({cabecalho['data']}):")
+                    for c in iterar_turnos(arquivo):
                         print(f"Você: {c['entrada']}")
                         print(f"Bot: {c['resposta']}")
                         print("-"*30)
-                    if conversas:
-                        contexto_atual = conversas[-1].get('contexto')
+                        diario.registrar_turno(c)
+                        estado.retomar(c.get('contexto'))
             except:
                 print("Entrada inválida. Começando nova sessão.")
-                conversas = []
-    
-    id_sessao = gerar_id_sessao()
+                diario.fechar()
+                armazem.deletar(diario.arquivo)
+                diario = armazem.abrir_diario(id_sessao)
+                estado = EstadoConversa()
     
     while True:
         entrada = input("Você: ").strip()
         if entrada.lower() == 'sair':
             break
         
-        contexto_atual = atualizar_contexto(contexto_atual, entrada)
-        entrada_exp = expandir_pergunta_com_contexto(entrada, contexto_atual)
-        
-        entrada_proc = preprocessar_texto(entrada_exp)
-        embedding_usuario = modelo_st.encode(entrada_proc, convert_to_tensor=True)
-        
-        similaridades = util.cos_sim(embedding_usuario, embeddings_perguntas)
-        indice_mais_proximo = int(similaridades.argmax())
-        confianca = float(similaridades.max())
-        
-        if confianca < 0.65:
-            resposta_bot = "Desculpe, não entendi sua pergunta. Pode reformular?"
-        else:
-            resposta_bot = respostas[indice_mais_proximo]
+        resposta_bot, confianca = chatbot.responder(entrada, estado)
         
         print(f"Bot: {resposta_bot}")
         print(f"Confiança: {confianca:.2f}\n")
         
-        conversas.append({
+        # Gravado no diário assim que acontece: um crash não perde a conversa
+        diario.registrar_turno({
             'entrada': entrada,
             'resposta': resposta_bot,
-            'confianca': confianca,
-            'contexto': contexto_atual
+            'confianca': float(confianca),
+            'contexto': dict(estado.contexto)
         })
     
-    salvar_sessao(id_sessao, conversas)
+    diario.fechar()
     print(f"\n💾 Histórico salvo na sessão: {id_sessao}")
+    estatisticas = chatbot.cache.estatisticas()
+    print(f"⚡ Cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas, {estatisticas['despejos']} despejos")
     print("👋 Até logo!")
 
+# ===============================
+# Opções de linha de comando no formato --nome=valor
+def ler_opcao(nome, padrao=None, tipo=str):
+    prefixo = f'--{nome}='
+    for arg in sys.argv:
+        if arg.startswith(prefixo):
+            return tipo(arg[len(prefixo):])
+    return padrao
+
 # ===============================
 # Execução principal
 if __name__ == "__main__":
     caminho_dados = r"C:\Users\zCarlin\Desktop\ChatBot-Teste-main\ChatBot-Teste-main\Dados\dataset_expandido_balanceado.csv"
-    caminho_modelo = "modelo_semantico.pkl"
+    caminho_modelo = CAMINHO_ARTEFATO
+    backend = ler_opcao('backend')
+    processos = ler_opcao('processos', 1, int)
+    tamanho_bloco = ler_opcao('tamanho-bloco', 4096, int)
+    batch_size = ler_opcao('batch-size', 64, int)
+    precisao = ler_opcao('precisao')
+    usar_votacao = '--votacao' in sys.argv
+    streaming = '--streaming' in sys.argv
+    linhas_por_bloco = ler_opcao('linhas-por-bloco', 50000, int)
 
     if not os.path.exists(caminho_dados):
         print(f"❌ Dataset não encontrado: {caminho_dados}")
     else:
-        if os.path.exists(caminho_modelo):
-            modelo_st, embeddings, perguntas, respostas = carregar_modelo_e_dados(caminho_modelo)
+        if backend is not None and backend not in BACKENDS:
+            print(f"❌ Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+            sys.exit(1)
+        if precisao is not None and precisao not in PRECISOES:
+            print(f"❌ Precisão desconhecida: {precisao} (opções: {', '.join(PRECISOES)})")
+            sys.exit(1)
+
+        if streaming and usar_votacao:
+            # A calibração da votação precisa do banco inteiro em memória
+            print("⚠️ --votacao não é avaliada com --streaming; a configuração da build anterior é mantida")
+            usar_votacao = False
+
+        if streaming:
+            df = None
+            digest = digest_csv(caminho_dados, linhas_por_bloco)
         else:
             df = carregar_dados(caminho_dados)
-            modelo_st = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-            print("🧠 Gerando embeddings...")
-            embeddings = modelo_st.encode(df['input_text'].tolist(), convert_to_tensor=True)
-            salvar_modelo_e_dados(modelo_st, embeddings, df, caminho_modelo)
-            perguntas = df['input_text'].tolist()
-            respostas = df['resposta'].tolist()
-
-        iniciar_chat_semantico(modelo_st, embeddings, perguntas, respostas)
\ No newline at end of file
+            digest = digest_dados(df)
+        artefato_anterior = Artefato(caminho_modelo) if os.path.isdir(caminho_modelo) else None
+
+        if artefato_anterior is not None and artefato_anterior.manifesto.get('digest_dados') == digest \
+                and artefato_anterior.manifesto.get('intents') \
+                and artefato_anterior.manifesto.get('normalizacao') == assinatura_normalizacao() \
+                and (backend is None or backend == artefato_anterior.manifesto.get('indice')) \
+                and (precisao is None or precisao == artefato_anterior.manifesto.get('precisao', 'float32')) \
+                and (not usar_votacao or 'votacao' in artefato_anterior.manifesto):
+            print("✅ Artefato já está atualizado com o CSV.")
+            artefato_anterior = None
+        else:
+            if artefato_anterior is not None:
+                print("🔄 CSV ou configuração mudou desde a última build, reconstruindo de forma incremental...")
+                modelo_st = artefato_anterior.carregar_modelo()
+                cache_anterior = None if streaming else artefato_anterior.cache_embeddings()
+                votacao_anterior = artefato_anterior.manifesto.get('votacao')
+                backend = backend or artefato_anterior.manifesto.get('indice') or 'centroides'
+                precisao = precisao or artefato_anterior.manifesto.get('precisao', 'float32')
+                # Solta os arquivos mapeados antes de o artefato ser substituído
+                artefato_anterior = None
+            else:
+                modelo_st = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+                cache_anterior = None
+                votacao_anterior = None
+                backend = backend or 'centroides'
+                precisao = precisao or 'float32'
+
+            if streaming:
+                construir_artefato_em_blocos(caminho_dados, modelo_st, caminho_modelo, backend, True, digest,
+                                             precisao, votacao_anterior, linhas_por_bloco, caminho_modelo + '.blocos',
+                                             tamanho_bloco, processos, batch_size)
+            else:
+                embeddings, cache_embeddings = gerar_embeddings_incremental(
+                    modelo_st, df, cache_anterior, caminho_modelo + '.blocos', tamanho_bloco, processos, batch_size)
+                cache_anterior = None
+                if '--verificar-recall' in sys.argv:
+                    verificar_recall_indice(embeddings, df, backend)
+                # Sem --votacao, mantém a configuração da build anterior (como backend e precisão)
+                votacao = avaliar_votacao_holdout(embeddings, df, backend) if usar_votacao else votacao_anterior
+                embeddings, df = deduplicar_banco(embeddings, df)
+                salvar_modelo_e_dados(modelo_st, embeddings, df, caminho_modelo, backend, cache_embeddings, digest,
+                                      precisao, votacao)
+
+        chatbot = Chatbot(caminho_modelo)
+        armazem = ArmazemSessoes(criar_pasta_historico())
+
+        try:
+            if '--relatorio-exato' in sys.argv:
+                relatorio_correspondencia_exata(chatbot.indice_exato, armazem)
+            if '--avaliar-quantizacao' in sys.argv:
+                avaliar_quantizacao_artefato(caminho_modelo)
+
+            iniciar_chat_semantico(chatbot, armazem)
+        finally:
+            armazem.fechar()
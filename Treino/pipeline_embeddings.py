@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+# ===============================
+# Pipeline de embeddings em blocos, paralelo e retomável
+#
+# Os textos são divididos em blocos de tamanho fixo. Cada bloco codificado é
+# gravado em <pasta>/bloco_NNNNN.npy assim que termina; se a build for
+# interrompida, a próxima execução com os mesmos textos pula os blocos prontos.
+# Com processos > 1 o encode usa o pool multiprocesso do sentence-transformers
+# (pensado para máquinas de build com muitos núcleos e sem GPU).
+# A build em streaming chama o encode uma vez por bloco do CSV, cada uma em uma
+# subpasta mantida até o fim da execução: a retomada vale para a execução inteira.
+
+def id_trabalho(textos, tamanho_bloco):
+    h = hashlib.sha1(str(tamanho_bloco).encode('utf-8'))
+    for texto in textos:
+        h.update(texto.encode('utf-8'))
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+def _preparar_pasta(pasta, trabalho):
+    caminho = os.path.join(pasta, 'trabalho.json')
+    if os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            if json.load(f) == trabalho:
+                return
+        print("🧽 Blocos de uma build diferente encontrados, descartando...")
+        shutil.rmtree(pasta)
+    os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(trabalho, f)
+
+def _salvar_bloco(caminho, embeddings):
+    # Grava com outro nome e renomeia: um bloco na pasta está sempre completo
+    temporario = caminho + '.tmp.npy'
+    np.save(temporario, embeddings)
+    os.replace(temporario, caminho)
+
+def iniciar_pool(modelo_st, processos):
+    # Limita as threads de cada processo filho para não disputar os mesmos núcleos
+    threads_anterior = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(max(1, (os.cpu_count() or 1) // processos))
+    try:
+        return modelo_st.start_multi_process_pool(['cpu'] * processos)
+    finally:
+        if threads_anterior is None:
+            del os.environ['OMP_NUM_THREADS']
+        else:
+            os.environ['OMP_NUM_THREADS'] = threads_anterior
+
+def preparar_execucao(pasta, execucao):
+    # Pasta de blocos compartilhada por várias chamadas de codificar_em_blocos (uma subpasta
+    # por chamada, com limpar=False): descartada se for de outra execução
+    _preparar_pasta(pasta, execucao)
+
+def codificar_em_blocos(modelo_st, textos, pasta, tamanho_bloco=4096, processos=1, batch_size=64, limpar=True):
+    textos = list(textos)
+    dimensao = modelo_st.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(textos), dimensao), dtype=np.float32)
+    if not textos:
+        return embeddings
+
+    n_blocos = (len(textos) + tamanho_bloco - 1) // tamanho_bloco
+    _preparar_pasta(pasta, {'id': id_trabalho(textos, tamanho_bloco), 'n_textos': len(textos),
+                            'tamanho_bloco': tamanho_bloco, 'dimensao': dimensao})
+
+    pool = None
+    codificados = 0
+    inicio_total = time.perf_counter()
+    try:
+        for b in range(n_blocos):
+            inicio, fim = b * tamanho_bloco, min((b + 1) * tamanho_bloco, len(textos))
+            caminho_bloco = os.path.join(pasta, f'bloco_{b:05d}.npy')
+            if os.path.exists(caminho_bloco):
+                embeddings[inicio:fim] = np.load(caminho_bloco)
+                print(f"⏩ Bloco {b + 1}/{n_blocos} já codificado, retomando")
+                continue
+
+            inicio_bloco = time.perf_counter()
+            if processos > 1:
+                if pool is None:
+                    pool = iniciar_pool(modelo_st, processos)
+                bloco = modelo_st.encode_multi_process(textos[inicio:fim], pool, batch_size=batch_size)
+            else:
+                bloco = modelo_st.encode(textos[inicio:fim], batch_size=batch_size)
+            bloco = np.asarray(bloco, dtype=np.float32)
+            _salvar_bloco(caminho_bloco, bloco)
+            embeddings[inicio:fim] = bloco
+
+            duracao = time.perf_counter() - inicio_bloco
+            codificados += fim - inicio
+            print(f"🧠 Bloco {b + 1}/{n_blocos}: {fim - inicio} frases em {duracao:.1f}s "
+                  f"({(fim - inicio) / duracao:.0f} frases/s)")
+    finally:
+        if pool is not None:
+            modelo_st.stop_multi_process_pool(pool)
+
+    duracao_total = time.perf_counter() - inicio_total
+    if codificados:
+        print(f"📈 {codificados} frases codificadas em {duracao_total:.1f}s "
+              f"({codificados / duracao_total:.0f} frases/s, {processos} processo(s), batch {batch_size})")
+
+    if limpar:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return embeddings